@@ -6,210 +6,181 @@ references the old langflow module structure.
 """
 
 import importlib
+import importlib.abc
 import importlib.util
 import sys
+from functools import lru_cache
+from pathlib import Path
 from types import ModuleType
 from typing import Any
 
+# klx packages mirrored under kluisz.*. A submodule is aliased to klx when this
+# directory has no file for it; modules that do have one are kluisz's own.
+_COMPAT_PACKAGES = ("base", "inputs", "schema", "template", "components")
+
+# Compatibility stubs in this directory that are replaced by the full klx module
+_COMPAT_STUB_MODULES = frozenset(
+    {
+        "kluisz.inputs.inputs",
+        "kluisz.template.field.base",
+        "kluisz.base.data.utils",
+        "kluisz.base.io.chat",
+        "kluisz.base.io.text",
+        "kluisz.base.models.google_generative_ai_constants",
+        "kluisz.base.models.openai_constants",
+        "kluisz.base.models.anthropic_constants",
+        "kluisz.base.models.aiml_constants",
+        "kluisz.base.models.aws_constants",
+        "kluisz.base.models.groq_constants",
+        "kluisz.base.models.novita_constants",
+        "kluisz.base.models.ollama_constants",
+        "kluisz.base.models.sambanova_constants",
+        "kluisz.base.models.cometapi_constants",
+        "kluisz.base.prompts.api_utils",
+        "kluisz.base.prompts.utils",
+    }
+)
+
+_KLUISZ_ROOT = Path(__file__).parent
+
+# Lookup tables derived once from the package lists above. The finder sits at the
+# front of sys.meta_path, so _klx_name_for runs for every import in the process.
+_COMPAT_MODULE_NAMES = frozenset(f"kluisz.{package}" for package in _COMPAT_PACKAGES)
+_COMPAT_MODULE_PREFIXES = tuple(f"kluisz.{package}." for package in _COMPAT_PACKAGES)
+
+# Modules that exist only in kluisz (like knowledge_bases), with their file relative to this directory
+_KLUISZ_ONLY_MODULES = (
+    ("kluisz.base.data.kb_utils", ("base", "data", "kb_utils.py")),
+    ("kluisz.base.knowledge_bases", ("base", "knowledge_bases", "__init__.py")),
+    ("kluisz.components.knowledge_bases", ("components", "knowledge_bases", "__init__.py")),
+)
+
+
+def _klx_name_for(kluisz_name: str) -> str | None:
+    """Return the klx module mirrored by ``kluisz_name``, or None if it is not mirrored."""
+    if kluisz_name in _COMPAT_MODULE_NAMES or kluisz_name.startswith(_COMPAT_MODULE_PREFIXES):
+        return "klx" + kluisz_name[len("kluisz") :]
+    return None
+
+
+@lru_cache(maxsize=1)
+def _klx_root() -> Path | None:
+    """Resolve the klx package directory once."""
+    klx_spec = importlib.util.find_spec("klx")
+    if klx_spec is None or not klx_spec.submodule_search_locations:
+        return None
+    return Path(klx_spec.submodule_search_locations[0])
+
+
+def _module_file_exists(root: Path, module_name: str) -> bool:
+    """Check whether ``module_name`` has a module or package file under the package ``root``."""
+    module_path = root.joinpath(*module_name.split(".")[1:])
+    return module_path.with_suffix(".py").is_file() or (module_path / "__init__.py").is_file()
+
+
+def _klx_module_exists(klx_name: str) -> bool:
+    """Check for a klx module on disk without walking sys.path again.
 
-class KluiszCompatibilityModule(ModuleType):
-    """A module that forwards attribute access to the corresponding klx module."""
+    Moved klx modules have no file; their package registers a redirect in sys.modules
+    instead, which is in place by the time one of its children is imported.
+    """
+    klx_root = _klx_root()
+    return (klx_root is not None and _module_file_exists(klx_root, klx_name)) or klx_name in sys.modules
 
-    def __init__(self, name: str, klx_module_name: str):
-        super().__init__(name)
+
+class KluiszCompatibilityLoader(importlib.abc.Loader):
+    """Loader that aliases a kluisz module name to the corresponding klx module.
+
+    ``sys.modules["kluisz.x"]`` ends up being the very same object as ``sys.modules["klx.x"]``,
+    so class identity holds trivially and attribute access involves no forwarding. An aliased
+    package brings klx's ``__path__`` along, which is why packages that exist in this
+    directory are never aliased: their kluisz-only submodules must stay importable.
+    """
+
+    def __init__(self, klx_module_name: str):
         self._klx_module_name = klx_module_name
-        self._klx_module = None
-
-    def _get_klx_module(self):
-        """Lazily import and cache the klx module."""
-        if self._klx_module is None:
-            try:
-                self._klx_module = importlib.import_module(self._klx_module_name)
-            except ImportError as e:
-                msg = f"Cannot import {self._klx_module_name} for backwards compatibility with {self.__name__}"
-                raise ImportError(msg) from e
-        return self._klx_module
-
-    def __getattr__(self, name: str) -> Any:
-        """Forward attribute access to the klx module with caching."""
-        klx_module = self._get_klx_module()
-        try:
-            attr = getattr(klx_module, name)
-        except AttributeError as e:
-            msg = f"module '{self.__name__}' has no attribute '{name}'"
-            raise AttributeError(msg) from e
-        else:
-            # Cache the attribute in our __dict__ for faster subsequent access
-            setattr(self, name, attr)
-            return attr
-
-    def __dir__(self):
-        """Return directory of the klx module."""
+        self._klx_spec = None
+
+    def create_module(self, spec):
         try:
-            klx_module = self._get_klx_module()
-            return dir(klx_module)
-        except ImportError:
-            return []
+            module = importlib.import_module(self._klx_module_name)
+        except ImportError as e:
+            msg = f"Cannot import {self._klx_module_name} for backwards compatibility with {spec.name}"
+            raise ImportError(msg) from e
+        self._klx_spec = module.__spec__
+        return module
+
+    def exec_module(self, module):
+        """Nothing to execute, the klx module was fully imported by create_module."""
+        # The import system unconditionally stamps our spec onto the module; give the klx
+        # module its own spec back so reloads and relative imports inside klx keep working.
+        module.__spec__ = self._klx_spec
+
+
+class KluiszCompatibilityFinder(importlib.abc.MetaPathFinder):
+    """Meta path finder that lazily aliases mirrored kluisz modules to their klx counterparts."""
+
+    def find_spec(self, fullname, path, target=None):  # noqa: ARG002
+        klx_name = _klx_name_for(fullname)
+        if klx_name is None or not _klx_module_exists(klx_name):
+            # Not mirrored, or doesn't exist in klx
+            return None
+        if fullname not in _COMPAT_STUB_MODULES and _module_file_exists(_KLUISZ_ROOT, fullname):
+            # kluisz has its own implementation
+            return None
+        return importlib.util.spec_from_loader(fullname, KluiszCompatibilityLoader(klx_name))
+
+
+def __getattr__(name: str) -> Any:
+    """Import mirrored top-level packages (kluisz.base, kluisz.inputs, ...) on first access."""
+    if name in _COMPAT_PACKAGES:
+        return importlib.import_module(f"{__name__}.{name}")
+    msg = f"module '{__name__}' has no attribute '{name}'"
+    raise AttributeError(msg)
+
+
+def _link_to_parent(name: str, module: ModuleType) -> None:
+    """Expose ``module`` as an attribute of its parent package if the parent is a kluisz module."""
+    parent_name, _, child_name = name.rpartition(".")
+    parent_module = sys.modules.get(parent_name)
+    # Mirrored parents are the klx modules themselves; don't leak kluisz modules into klx
+    if parent_module is not None and parent_module.__name__ == parent_name:
+        setattr(parent_module, child_name, module)
 
 
 def _setup_compatibility_modules():
     """Set up comprehensive compatibility modules for kluisz.base imports."""
-    # First, set up the base attribute on this module (kluisz)
-    current_module = sys.modules[__name__]
-
-    # Define all the modules we need to support
-    module_mappings = {
-        # Core base module
-        "kluisz.base": "klx.base",
-        # Inputs module - critical for class identity
-        "kluisz.inputs": "klx.inputs",
-        "kluisz.inputs.inputs": "klx.inputs.inputs",
-        # Schema modules - also critical for class identity
-        "kluisz.schema": "klx.schema",
-        "kluisz.schema.data": "klx.schema.data",
-        "kluisz.schema.serialize": "klx.schema.serialize",
-        # Template modules
-        "kluisz.template": "klx.template",
-        "kluisz.template.field": "klx.template.field",
-        "kluisz.template.field.base": "klx.template.field.base",
-        # Components modules
-        "kluisz.components": "klx.components",
-        "kluisz.components.helpers": "klx.components.helpers",
-        "kluisz.components.helpers.calculator_core": "klx.components.helpers.calculator_core",
-        "kluisz.components.helpers.create_list": "klx.components.helpers.create_list",
-        "kluisz.components.helpers.current_date": "klx.components.helpers.current_date",
-        "kluisz.components.helpers.id_generator": "klx.components.helpers.id_generator",
-        "kluisz.components.helpers.memory": "klx.components.helpers.memory",
-        "kluisz.components.helpers.output_parser": "klx.components.helpers.output_parser",
-        "kluisz.components.helpers.store_message": "klx.components.helpers.store_message",
-        # Individual modules that exist in klx
-        "kluisz.base.agents": "klx.base.agents",
-        "kluisz.base.chains": "klx.base.chains",
-        "kluisz.base.data": "klx.base.data",
-        "kluisz.base.data.utils": "klx.base.data.utils",
-        "kluisz.base.document_transformers": "klx.base.document_transformers",
-        "kluisz.base.embeddings": "klx.base.embeddings",
-        "kluisz.base.flow_processing": "klx.base.flow_processing",
-        "kluisz.base.io": "klx.base.io",
-        "kluisz.base.io.chat": "klx.base.io.chat",
-        "kluisz.base.io.text": "klx.base.io.text",
-        "kluisz.base.langchain_utilities": "klx.base.langchain_utilities",
-        "kluisz.base.memory": "klx.base.memory",
-        "kluisz.base.models": "klx.base.models",
-        "kluisz.base.models.google_generative_ai_constants": "klx.base.models.google_generative_ai_constants",
-        "kluisz.base.models.openai_constants": "klx.base.models.openai_constants",
-        "kluisz.base.models.anthropic_constants": "klx.base.models.anthropic_constants",
-        "kluisz.base.models.aiml_constants": "klx.base.models.aiml_constants",
-        "kluisz.base.models.aws_constants": "klx.base.models.aws_constants",
-        "kluisz.base.models.groq_constants": "klx.base.models.groq_constants",
-        "kluisz.base.models.novita_constants": "klx.base.models.novita_constants",
-        "kluisz.base.models.ollama_constants": "klx.base.models.ollama_constants",
-        "kluisz.base.models.sambanova_constants": "klx.base.models.sambanova_constants",
-        "kluisz.base.models.cometapi_constants": "klx.base.models.cometapi_constants",
-        "kluisz.base.prompts": "klx.base.prompts",
-        "kluisz.base.prompts.api_utils": "klx.base.prompts.api_utils",
-        "kluisz.base.prompts.utils": "klx.base.prompts.utils",
-        "kluisz.base.textsplitters": "klx.base.textsplitters",
-        "kluisz.base.tools": "klx.base.tools",
-        "kluisz.base.vectorstores": "klx.base.vectorstores",
-    }
-
-    # Create compatibility modules for each mapping
-    for kluisz_name, klx_name in module_mappings.items():
-        if kluisz_name not in sys.modules:
-            # Check if the klx module exists
-            try:
-                spec = importlib.util.find_spec(klx_name)
-                if spec is not None:
-                    # Create compatibility module
-                    compat_module = KluiszCompatibilityModule(kluisz_name, klx_name)
-                    sys.modules[kluisz_name] = compat_module
-
-                    # Set up the module hierarchy
-                    parts = kluisz_name.split(".")
-                    if len(parts) > 1:
-                        parent_name = ".".join(parts[:-1])
-                        parent_module = sys.modules.get(parent_name)
-                        if parent_module is not None:
-                            setattr(parent_module, parts[-1], compat_module)
-
-                    # Special handling for top-level modules
-                    if kluisz_name == "kluisz.base":
-                        current_module.base = compat_module
-                    elif kluisz_name == "kluisz.inputs":
-                        current_module.inputs = compat_module
-                    elif kluisz_name == "kluisz.schema":
-                        current_module.schema = compat_module
-                    elif kluisz_name == "kluisz.template":
-                        current_module.template = compat_module
-                    elif kluisz_name == "kluisz.components":
-                        current_module.components = compat_module
-            except (ImportError, ValueError):
-                # Skip modules that don't exist in klx
-                continue
+    # Mirrored modules are created on first import. The finder goes first so that the
+    # stubs in _COMPAT_STUB_MODULES resolve to klx rather than to their file here, and so
+    # that a name missing here is not loaded a second time through an aliased klx
+    # parent's __path__. Every other module with a file in this directory is a real
+    # kluisz implementation: the finder declines it and the regular path finder loads it.
+    if not any(isinstance(finder, KluiszCompatibilityFinder) for finder in sys.meta_path):
+        sys.meta_path.insert(0, KluiszCompatibilityFinder())
 
     # Handle modules that exist only in kluisz (like knowledge_bases)
     # These need special handling because they're not in lfx yet
-    kluisz_only_modules = {
-        "kluisz.base.data.kb_utils": "kluisz.base.data.kb_utils",
-        "kluisz.base.knowledge_bases": "kluisz.base.knowledge_bases",
-        "kluisz.components.knowledge_bases": "kluisz.components.knowledge_bases",
-    }
-
-    for kluisz_name in kluisz_only_modules:
-        if kluisz_name not in sys.modules:
-            try:
-                # Try to find the actual physical module file
-                from pathlib import Path
-
-                base_dir = Path(__file__).parent
-
-                if kluisz_name == "kluisz.base.data.kb_utils":
-                    kb_utils_file = base_dir / "base" / "data" / "kb_utils.py"
-                    if kb_utils_file.exists():
-                        spec = importlib.util.spec_from_file_location(kluisz_name, kb_utils_file)
-                        if spec is not None and spec.loader is not None:
-                            module = importlib.util.module_from_spec(spec)
-                            sys.modules[kluisz_name] = module
-                            spec.loader.exec_module(module)
-
-                            # Also add to parent module
-                            parent_module = sys.modules.get("kluisz.base.data")
-                            if parent_module is not None:
-                                parent_module.kb_utils = module
-
-                elif kluisz_name == "kluisz.base.knowledge_bases":
-                    kb_dir = base_dir / "base" / "knowledge_bases"
-                    kb_init_file = kb_dir / "__init__.py"
-                    if kb_init_file.exists():
-                        spec = importlib.util.spec_from_file_location(kluisz_name, kb_init_file)
-                        if spec is not None and spec.loader is not None:
-                            module = importlib.util.module_from_spec(spec)
-                            sys.modules[kluisz_name] = module
-                            spec.loader.exec_module(module)
-
-                            # Also add to parent module
-                            parent_module = sys.modules.get("kluisz.base")
-                            if parent_module is not None:
-                                parent_module.knowledge_bases = module
-
-                elif kluisz_name == "kluisz.components.knowledge_bases":
-                    components_kb_dir = base_dir / "components" / "knowledge_bases"
-                    components_kb_init_file = components_kb_dir / "__init__.py"
-                    if components_kb_init_file.exists():
-                        spec = importlib.util.spec_from_file_location(kluisz_name, components_kb_init_file)
-                        if spec is not None and spec.loader is not None:
-                            module = importlib.util.module_from_spec(spec)
-                            sys.modules[kluisz_name] = module
-                            spec.loader.exec_module(module)
-
-                            # Also add to parent module
-                            parent_module = sys.modules.get("kluisz.components")
-                            if parent_module is not None:
-                                parent_module.knowledge_bases = module
-            except (ImportError, AttributeError):
-                # If direct file loading fails, skip silently
+    base_dir = Path(__file__).parent
+    for kluisz_name, relative_path in _KLUISZ_ONLY_MODULES:
+        if kluisz_name in sys.modules:
+            continue
+        # Try to find the actual physical module file
+        module_file = base_dir.joinpath(*relative_path)
+        if not module_file.exists():
+            continue
+        try:
+            spec = importlib.util.spec_from_file_location(kluisz_name, module_file)
+            if spec is None or spec.loader is None:
                 continue
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[kluisz_name] = module
+            spec.loader.exec_module(module)
+
+            # Also add to parent module
+            _link_to_parent(kluisz_name, module)
+        except (ImportError, AttributeError):
+            # If direct file loading fails, skip silently
+            continue
 
 
 # Set up all the compatibility modules
@@ -2,7 +2,9 @@
 import asyncio
 import hashlib
 import os
+from functools import lru_cache
 from logging.config import fileConfig
+from pathlib import Path
 from typing import Any
 
 
@@ -43,6 +45,48 @@ target_metadata.naming_convention = NAMING_CONVENTION
 # my_important_option = config.get_main_option("my_important_option")
 # ... etc.
 
+# Static advisory lock key used when no namespace is configured
+DEFAULT_MIGRATION_LOCK_KEY = 11223344
+
+
+def _compute_lock_key(namespace: str | None) -> int:
+    """Derive the PostgreSQL advisory lock key for a migration lock namespace.
+
+    The key must stay identical across releases: during a rolling deploy, old and new
+    instances have to contend for the same lock. Do not change the hash function.
+    """
+    if not namespace:
+        return DEFAULT_MIGRATION_LOCK_KEY
+    # First 8 bytes of the digest, i.e. the first 16 hex characters
+    return int.from_bytes(hashlib.sha256(namespace.encode()).digest()[:8], "big") % (2**63 - 1)
+
+
+# The namespace cannot change during the process lifetime, so the key is derived once
+MIGRATION_LOCK_NAMESPACE = os.getenv("KLUISZ_MIGRATION_LOCK_NAMESPACE")
+MIGRATION_LOCK_KEY = _compute_lock_key(MIGRATION_LOCK_NAMESPACE)
+
+
+@lru_cache(maxsize=1)
+def _find_project_root() -> Path:
+    """Find the project root by looking for .env or Makefile above this file."""
+    current = Path(__file__).parent
+    for _ in range(10):
+        if (current / ".env").exists() or (current / "Makefile").exists():
+            return current
+        current = current.parent
+    # Fallback: 5 levels up from alembic/env.py
+    return Path(__file__).parent.parent.parent.parent.parent
+
+
+def _resolve_sqlite_url(url: str) -> str:
+    """Make a relative SQLite database path absolute, relative to the project root."""
+    # Extract path from sqlite:///path or sqlite+aiosqlite:///path
+    if url.startswith("sqlite") and ":///" in url:
+        prefix, db_path = url.split(":///", 1)
+        if not os.path.isabs(db_path) and not db_path.startswith(":"):
+            return f"{prefix}:///{_find_project_root() / db_path}"
+    return url
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -59,24 +103,8 @@ def run_migrations_offline() -> None:
     # Override database URL from environment variable if set
     url = os.getenv("KLUISZ_DATABASE_URL") or config.get_main_option("sqlalchemy.url")
     # Convert relative paths to absolute paths for SQLite
-    if url and url.startswith("sqlite") and ":///" in url:
-        parts = url.split(":///", 1)
-        if len(parts) == 2:
-            db_path = parts[1]
-            if not os.path.isabs(db_path) and not db_path.startswith(":"):
-                from pathlib import Path
-                # Find project root by looking for .env or Makefile
-                current = Path(__file__).parent
-                for _ in range(10):
-                    if (current / ".env").exists() or (current / "Makefile").exists():
-                        project_root = current
-                        break
-                    current = current.parent
-                else:
-                    # Fallback: 5 levels up from alembic/env.py
-                    project_root = Path(__file__).parent.parent.parent.parent.parent
-                db_path = str(project_root / db_path)
-                url = f"{parts[0]}:///{db_path}"
+    if url:
+        url = _resolve_sqlite_url(url)
     configure_kwargs = {
         "url": url,
         "target_metadata": target_metadata,
@@ -120,21 +148,22 @@ def _do_run_migrations(connection):
     # Only add prepare_threshold for PostgreSQL
     if connection.dialect.name == "postgresql":
         configure_kwargs["prepare_threshold"] = None
+        # Read by kluisz.utils.migration.autocommit_block to keep the lock across a commit
+        configure_kwargs["migration_lock_key"] = MIGRATION_LOCK_KEY
 
     context.configure(**configure_kwargs)
     with context.begin_transaction():
         if connection.dialect.name == "postgresql":
             # Use namespace from environment variable if provided, otherwise use default static key
-            namespace = os.getenv("KLUISZ_MIGRATION_LOCK_NAMESPACE")
-            if namespace:
-                lock_key = int(hashlib.sha256(namespace.encode()).hexdigest()[:16], 16) % (2**63 - 1)
-                logger.info(f"Using migration lock namespace: {namespace}, lock_key: {lock_key}")
+            if MIGRATION_LOCK_NAMESPACE:
+                logger.info(
+                    f"Using migration lock namespace: {MIGRATION_LOCK_NAMESPACE}, lock_key: {MIGRATION_LOCK_KEY}"
+                )
             else:
-                lock_key = 11223344
-                logger.info(f"Using default migration lock_key: {lock_key}")
+                logger.info(f"Using default migration lock_key: {MIGRATION_LOCK_KEY}")
 
             connection.execute(text("SET LOCAL lock_timeout = '180s';"))
-            connection.execute(text(f"SELECT pg_advisory_xact_lock({lock_key});"))
+            connection.execute(text(f"SELECT pg_advisory_xact_lock({MIGRATION_LOCK_KEY});"))
         context.run_migrations()
 
 async def _run_async_migrations() -> None:
@@ -146,26 +175,7 @@ async def _run_async_migrations() -> None:
     db_url = os.getenv("KLUISZ_DATABASE_URL") or config_section.get("sqlalchemy.url", "")
     if db_url:
         # Convert relative paths to absolute paths for SQLite
-        if db_url.startswith("sqlite") and ":///" in db_url:
-            # Extract path from sqlite:///path or sqlite+aiosqlite:///path
-            parts = db_url.split(":///", 1)
-            if len(parts) == 2:
-                db_path = parts[1]
-                # If relative path, make it relative to project root
-                if not os.path.isabs(db_path) and not db_path.startswith(":"):
-                    from pathlib import Path
-                    # Find project root by looking for .env or Makefile
-                    current = Path(__file__).parent
-                    for _ in range(10):
-                        if (current / ".env").exists() or (current / "Makefile").exists():
-                            project_root = current
-                            break
-                        current = current.parent
-                    else:
-                        # Fallback: 5 levels up from alembic/env.py
-                        project_root = Path(__file__).parent.parent.parent.parent.parent
-                    db_path = str(project_root / db_path)
-                    db_url = f"{parts[0]}:///{db_path}"
+        db_url = _resolve_sqlite_url(db_url)
         config_section["sqlalchemy.url"] = db_url
 
     connect_args: dict[str, Any] = {}
@@ -9,6 +9,7 @@ import json
 from typing import Sequence, Union
 
 from alembic import op
+import orjson
 import sqlalchemy as sa
 import sqlmodel
 from sqlalchemy.engine.reflection import Inspector
@@ -21,6 +22,37 @@ down_revision: Union[str, None] = 'd9a6ea21edcd'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
+# Number of folder rows fetched, transformed and written back per round trip
+BATCH_SIZE = 1000
+
+# Built once so every batch reuses the same statement object and its cached compiled form
+UPDATE_AUTH_SETTINGS = sa.text("UPDATE folder SET auth_settings = :auth_settings WHERE id = :id")
+
+
+def _build_updates(rows, transform, action: str) -> list[dict]:
+    """Apply ``transform`` to each row's auth_settings and return the UPDATE parameters.
+
+    Rows that fail to transform are reported and skipped so the rest of the table is still migrated.
+    """
+    updates = []
+    for row in rows:
+        folder_id = row.id
+        auth_settings = row.auth_settings
+
+        if auth_settings:
+            try:
+                # Parse JSON if it's a string
+                auth_settings_dict = orjson.loads(auth_settings) if isinstance(auth_settings, str) else auth_settings
+
+                transformed_settings = transform(auth_settings_dict)
+                if transformed_settings:
+                    # Serialized with json.dumps like before, so the stored text keeps its format
+                    updates.append({"auth_settings": json.dumps(transformed_settings), "id": folder_id})
+            except Exception as e:
+                # Log the error but continue with other records
+                print(f"Warning: Failed to {action} auth_settings for folder {folder_id}: {e}")
+    return updates
+
 
 def upgrade() -> None:
     """Encrypt sensitive fields in existing auth_settings data."""
@@ -33,45 +65,25 @@ def upgrade() -> None:
         
         # Check if the folder table exists
         inspector = sa.inspect(conn)
-        if 'folder' not in inspector.get_table_names():
+        if not inspector.has_table('folder'):
             return
         
         # Check if auth_settings column exists
-        columns = [col['name'] for col in inspector.get_columns('folder')]
-        if 'auth_settings' not in columns:
+        if not any(col['name'] == 'auth_settings' for col in inspector.get_columns('folder')):
             return
             
-        # Query all folders with auth_settings
+        # Stream all folders with auth_settings so only one batch is held in memory
         result = conn.execute(
-            sa.text("SELECT id, auth_settings FROM folder WHERE auth_settings IS NOT NULL")
+            sa.text("SELECT id, auth_settings FROM folder WHERE auth_settings IS NOT NULL"),
+            execution_options={"stream_results": True, "yield_per": BATCH_SIZE},
         )
-        
-        # Encrypt auth_settings for each folder
-        for row in result:
-            folder_id = row.id
-            auth_settings = row.auth_settings
-            
-            if auth_settings:
-                try:
-                    # Parse JSON if it's a string
-                    if isinstance(auth_settings, str):
-                        auth_settings_dict = json.loads(auth_settings)
-                    else:
-                        auth_settings_dict = auth_settings
-                    
-                    # Encrypt sensitive fields
-                    encrypted_settings = encrypt_auth_settings(auth_settings_dict)
-                    
-                    # Update the record with encrypted data
-                    if encrypted_settings:
-                        conn.execute(
-                            sa.text("UPDATE folder SET auth_settings = :auth_settings WHERE id = :id"),
-                            {"auth_settings": json.dumps(encrypted_settings), "id": folder_id}
-                        )
-                except Exception as e:
-                    # Log the error but continue with other records
-                    print(f"Warning: Failed to encrypt auth_settings for folder {folder_id}: {e}")
-                    
+
+        # Encrypt auth_settings batch by batch, writing each batch back in a single executemany
+        for rows in result.partitions():
+            updates = _build_updates(rows, encrypt_auth_settings, "encrypt")
+            if updates:
+                conn.execute(UPDATE_AUTH_SETTINGS, updates)
+
     except ImportError as e:
         # If encryption utilities are not available, skip the migration
         print(f"Warning: Encryption utilities not available, skipping encryption migration: {e}")
@@ -88,45 +100,25 @@ def downgrade() -> None:
         
         # Check if the folder table exists
         inspector = sa.inspect(conn)
-        if 'folder' not in inspector.get_table_names():
+        if not inspector.has_table('folder'):
             return
         
         # Check if auth_settings column exists
-        columns = [col['name'] for col in inspector.get_columns('folder')]
-        if 'auth_settings' not in columns:
+        if not any(col['name'] == 'auth_settings' for col in inspector.get_columns('folder')):
             return
             
-        # Query all folders with auth_settings
+        # Stream all folders with auth_settings so only one batch is held in memory
         result = conn.execute(
-            sa.text("SELECT id, auth_settings FROM folder WHERE auth_settings IS NOT NULL")
+            sa.text("SELECT id, auth_settings FROM folder WHERE auth_settings IS NOT NULL"),
+            execution_options={"stream_results": True, "yield_per": BATCH_SIZE},
         )
-        
-        # Decrypt auth_settings for each folder
-        for row in result:
-            folder_id = row.id
-            auth_settings = row.auth_settings
-            
-            if auth_settings:
-                try:
-                    # Parse JSON if it's a string
-                    if isinstance(auth_settings, str):
-                        auth_settings_dict = json.loads(auth_settings)
-                    else:
-                        auth_settings_dict = auth_settings
-                    
-                    # Decrypt sensitive fields
-                    decrypted_settings = decrypt_auth_settings(auth_settings_dict)
-                    
-                    # Update the record with decrypted data
-                    if decrypted_settings:
-                        conn.execute(
-                            sa.text("UPDATE folder SET auth_settings = :auth_settings WHERE id = :id"),
-                            {"auth_settings": json.dumps(decrypted_settings), "id": folder_id}
-                        )
-                except Exception as e:
-                    # Log the error but continue with other records
-                    print(f"Warning: Failed to decrypt auth_settings for folder {folder_id}: {e}")
-                    
+
+        # Decrypt auth_settings batch by batch, writing each batch back in a single executemany
+        for rows in result.partitions():
+            updates = _build_updates(rows, decrypt_auth_settings, "decrypt")
+            if updates:
+                conn.execute(UPDATE_AUTH_SETTINGS, updates)
+
     except ImportError as e:
         # If decryption utilities are not available, skip the migration
         print(f"Warning: Decryption utilities not available, skipping decryption migration: {e}")
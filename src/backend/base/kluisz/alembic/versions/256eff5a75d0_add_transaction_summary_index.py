@@ -0,0 +1,53 @@
+"""Add a composite index for credit transaction summaries
+
+Revision ID: 256eff5a75d0
+Revises: bf0dd7ac7e5d
+Create Date: 2026-10-17 04:19:09.000000
+
+The billing summaries aggregate deductions filtered by transaction type,
+user and time range. A composite index on those columns lets the
+aggregate scan one index range instead of the table.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+from kluisz.utils import migration
+
+# revision identifiers, used by Alembic.
+revision: str = "256eff5a75d0"
+down_revision: str | None = "bf0dd7ac7e5d"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+INDEX_NAME = "ix_transaction_type_user_id_timestamp"
+INDEX_COLUMNS = ["transaction_type", "user_id", "timestamp"]
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if not inspector.has_table("transaction"):
+        return
+    # An index left INVALID by a failed concurrent build counts as missing and is rebuilt
+    existing_indexes = {index["name"] for index in inspector.get_indexes("transaction")}
+    if INDEX_NAME in existing_indexes - migration.invalid_indexes(conn):
+        return
+
+    if conn.dialect.name == "postgresql":
+        # CREATE INDEX CONCURRENTLY keeps the table writable but cannot run in a transaction
+        with migration.autocommit_block():
+            migration.create_index_concurrently(INDEX_NAME, "transaction", INDEX_COLUMNS)
+    else:
+        op.create_index(INDEX_NAME, "transaction", INDEX_COLUMNS)
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if not inspector.has_table("transaction"):
+        return
+    if INDEX_NAME in {index["name"] for index in inspector.get_indexes("transaction")}:
+        op.drop_index(INDEX_NAME, table_name="transaction")
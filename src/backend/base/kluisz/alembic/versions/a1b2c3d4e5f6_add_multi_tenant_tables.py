@@ -22,48 +22,77 @@ depends_on: str | Sequence[str] | None = None
 def upgrade() -> None:
     conn = op.get_bind()
     inspector = sa.inspect(conn)
-    existing_tables = inspector.get_table_names()
-    
-    # Helper function to safely create table
+    existing_tables: set[str] = set(inspector.get_table_names())
+    new_tables = {"tenant", "license", "tenant_usage_stats", "user_usage_stats"}
+    tenant_scoped_tables = {"user", "flow", "folder", "variable", "apikey", "file"}
+    # Skip all further reflection when the multi-tenant schema is already in place
+    if new_tables <= existing_tables and "tenant_id" in {col["name"] for col in inspector.get_columns("user")}:
+        return
+
+    # Index, column and foreign key names of the tables this migration touches, reflected in a single
+    # pass each, so the helpers below can check before issuing DDL instead of catching failures
+    reflected_tables = sorted(existing_tables & (new_tables | tenant_scoped_tables))
+    index_cache: dict[str, set[str]] = {
+        table: {idx["name"] for idx in indexes}
+        for (_, table), indexes in inspector.get_multi_indexes(filter_names=reflected_tables).items()
+    }
+    column_cache: dict[str, set[str]] = {
+        table: {col["name"] for col in columns}
+        for (_, table), columns in inspector.get_multi_columns(filter_names=reflected_tables).items()
+    }
+    fk_cache: dict[str, set[str]] = {
+        table: {fk["name"] for fk in fks}
+        for (_, table), fks in inspector.get_multi_foreign_keys(filter_names=reflected_tables).items()
+    }
+
+    # Helper function to create a table unless it already exists; the database does the check
     def safe_create_table(table_name, *args, **kwargs):
+        op.create_table(table_name, *args, if_not_exists=True, **kwargs)
+        # Keep the snapshot current so indexes on the new table are created too
         if table_name not in existing_tables:
-            try:
-                op.create_table(table_name, *args, **kwargs)
-            except Exception:
-                pass  # Table already exists
-    
-    # Helper function to safely create index
-    def safe_create_index(index_name_func, table_name, columns, **kwargs):
+            existing_tables.add(table_name)
+            index_cache[table_name] = set()
+
+    # Helper function to create the missing indexes of a table. On PostgreSQL they are sent
+    # as one multi-statement string, so a table's indexes cost a single round-trip.
+    def safe_create_indexes(table_name, *indexes):
         if table_name not in existing_tables:
             return  # Table doesn't exist yet, skip index creation
-        try:
-            # op.f() returns a callable that generates the index name
-            if callable(index_name_func):
-                index_name = index_name_func(table_name)
-            else:
-                index_name = index_name_func
-            # Check if index already exists
-            existing_indexes = [idx["name"] for idx in inspector.get_indexes(table_name)]
-            if index_name not in existing_indexes:
-                op.create_index(index_name, table_name, columns, **kwargs)
-        except Exception as e:
-            # Log but don't fail - index might already exist
-            pass
-    
-    # Helper function to safely add column
-    def safe_add_column(table_name, column):
-        try:
-            op.add_column(table_name, column)
-        except Exception:
-            pass  # Column already exists
-    
-    # Helper function to safely create foreign key
-    def safe_create_fk(fk_name, table_name, ref_table, local_cols, ref_cols, **kwargs):
-        try:
-            op.create_foreign_key(fk_name, table_name, ref_table, local_cols, ref_cols, **kwargs)
-        except Exception:
-            pass  # Foreign key already exists
-    
+        missing = [(name, columns, unique) for name, columns, unique in indexes if name not in index_cache[table_name]]
+        if not missing:
+            return
+        if conn.dialect.name == "postgresql":
+            quote = conn.dialect.identifier_preparer.quote
+            op.execute(
+                ";\n".join(
+                    f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {quote(name)} "
+                    f"ON {quote(table_name)} ({', '.join(quote(column) for column in columns)})"
+                    for name, columns, unique in missing
+                )
+            )
+        else:
+            for name, columns, unique in missing:
+                op.create_index(name, table_name, columns, unique=unique, if_not_exists=True)
+        index_cache[table_name].update(name for name, _, _ in missing)
+
+    # Helper function to add tenant columns, their foreign key and index to an existing table.
+    # Batch mode applies them together, so SQLite rebuilds the table once instead of per operation.
+    def add_tenant_columns(table_name, columns, fk_name, index_name):
+        new_columns = [column for column in columns if column.name not in column_cache[table_name]]
+        create_fk = fk_name not in fk_cache[table_name]
+        create_index = index_name not in index_cache[table_name]
+        if not (new_columns or create_fk or create_index):
+            return
+
+        with op.batch_alter_table(table_name) as batch_op:
+            for column in new_columns:
+                batch_op.add_column(column)
+            if create_fk:
+                batch_op.create_foreign_key(fk_name, "tenant", ["tenant_id"], ["id"], ondelete="SET NULL")
+            if create_index:
+                batch_op.create_index(index_name, ["tenant_id"], unique=False)
+        index_cache[table_name].add(index_name)
+
     # Create tenant table
     safe_create_table(
         "tenant",
@@ -78,9 +107,12 @@ def upgrade() -> None:
         sa.PrimaryKeyConstraint("id"),
         sa.UniqueConstraint("slug"),
     )
-    safe_create_index(op.f("ix_tenant_name"), "tenant", ["name"], unique=False)
-    safe_create_index(op.f("ix_tenant_slug"), "tenant", ["slug"], unique=True)
-    safe_create_index(op.f("ix_tenant_is_active"), "tenant", ["is_active"], unique=False)
+    safe_create_indexes(
+        "tenant",
+        ("ix_tenant_name", ["name"], False),
+        ("ix_tenant_slug", ["slug"], True),
+        ("ix_tenant_is_active", ["is_active"], False),
+    )
 
     # Create license table
     safe_create_table(
@@ -106,10 +138,13 @@ def upgrade() -> None:
         sa.ForeignKeyConstraint(["tenant_id"], ["tenant.id"], ondelete="CASCADE"),
         sa.PrimaryKeyConstraint("id"),
     )
-    safe_create_index(op.f("ix_license_tenant_id"), "license", ["tenant_id"], unique=False)
-    safe_create_index(op.f("ix_license_license_type"), "license", ["license_type"], unique=False)
-    safe_create_index(op.f("ix_license_tier"), "license", ["tier"], unique=False)
-    safe_create_index(op.f("ix_license_is_active"), "license", ["is_active"], unique=False)
+    safe_create_indexes(
+        "license",
+        ("ix_license_tenant_id", ["tenant_id"], False),
+        ("ix_license_license_type", ["license_type"], False),
+        ("ix_license_tier", ["tier"], False),
+        ("ix_license_is_active", ["is_active"], False),
+    )
 
     # Create tenant_usage_stats table
     safe_create_table(
@@ -130,8 +165,11 @@ def upgrade() -> None:
         sa.PrimaryKeyConstraint("id"),
         sa.UniqueConstraint("tenant_id", "stats_date", name="uq_tenant_usage_stats_tenant_date"),
     )
-    safe_create_index(op.f("ix_tenant_usage_stats_tenant_id"), "tenant_usage_stats", ["tenant_id"], unique=False)
-    safe_create_index(op.f("ix_tenant_usage_stats_stats_date"), "tenant_usage_stats", ["stats_date"], unique=False)
+    safe_create_indexes(
+        "tenant_usage_stats",
+        ("ix_tenant_usage_stats_tenant_id", ["tenant_id"], False),
+        ("ix_tenant_usage_stats_stats_date", ["stats_date"], False),
+    )
 
     # Create user_usage_stats table
     safe_create_table(
@@ -152,96 +190,87 @@ def upgrade() -> None:
         sa.PrimaryKeyConstraint("id"),
         sa.UniqueConstraint("user_id", "stats_date", name="uq_user_usage_stats_user_date"),
     )
-    safe_create_index(op.f("ix_user_usage_stats_user_id"), "user_usage_stats", ["user_id"], unique=False)
-    safe_create_index(op.f("ix_user_usage_stats_tenant_id"), "user_usage_stats", ["tenant_id"], unique=False)
-    safe_create_index(op.f("ix_user_usage_stats_stats_date"), "user_usage_stats", ["stats_date"], unique=False)
+    safe_create_indexes(
+        "user_usage_stats",
+        ("ix_user_usage_stats_user_id", ["user_id"], False),
+        ("ix_user_usage_stats_tenant_id", ["tenant_id"], False),
+        ("ix_user_usage_stats_stats_date", ["stats_date"], False),
+    )
 
     # Add tenant_id and is_tenant_admin to user table
-    safe_add_column("user", sa.Column("tenant_id", sa.String(), nullable=True))
-    safe_add_column("user", sa.Column("is_tenant_admin", sa.Boolean(), nullable=False, server_default="0"))
-    safe_create_fk("fk_user_tenant", "user", "tenant", ["tenant_id"], ["id"], ondelete="SET NULL")
-    safe_create_index(op.f("ix_user_tenant_id"), "user", ["tenant_id"], unique=False)
-
-    # Add tenant_id to flow table
-    safe_add_column("flow", sa.Column("tenant_id", sa.String(), nullable=True))
-    safe_create_fk("fk_flow_tenant", "flow", "tenant", ["tenant_id"], ["id"], ondelete="SET NULL")
-    safe_create_index(op.f("ix_flow_tenant_id"), "flow", ["tenant_id"], unique=False)
-
-    # Add tenant_id to folder table
-    safe_add_column("folder", sa.Column("tenant_id", sa.String(), nullable=True))
-    safe_create_fk("fk_folder_tenant", "folder", "tenant", ["tenant_id"], ["id"], ondelete="SET NULL")
-    safe_create_index(op.f("ix_folder_tenant_id"), "folder", ["tenant_id"], unique=False)
-
-    # Add tenant_id to variable table
-    safe_add_column("variable", sa.Column("tenant_id", sa.String(), nullable=True))
-    safe_create_fk("fk_variable_tenant", "variable", "tenant", ["tenant_id"], ["id"], ondelete="SET NULL")
-    safe_create_index(op.f("ix_variable_tenant_id"), "variable", ["tenant_id"], unique=False)
-
-    # Add tenant_id to apikey table
-    safe_add_column("apikey", sa.Column("tenant_id", sa.String(), nullable=True))
-    safe_create_fk("fk_apikey_tenant", "apikey", "tenant", ["tenant_id"], ["id"], ondelete="SET NULL")
-    safe_create_index(op.f("ix_apikey_tenant_id"), "apikey", ["tenant_id"], unique=False)
-
-    # Add tenant_id to file table
-    if "file" in existing_tables:
-        safe_add_column("file", sa.Column("tenant_id", sa.String(), nullable=True))
-        safe_create_fk("fk_file_tenant", "file", "tenant", ["tenant_id"], ["id"], ondelete="SET NULL")
-        safe_create_index(op.f("ix_file_tenant_id"), "file", ["tenant_id"], unique=False)
+    add_tenant_columns(
+        "user",
+        [
+            sa.Column("tenant_id", sa.String(), nullable=True),
+            sa.Column("is_tenant_admin", sa.Boolean(), nullable=False, server_default="0"),
+        ],
+        "fk_user_tenant",
+        "ix_user_tenant_id",
+    )
+
+    # Add tenant_id to flow, folder, variable and apikey tables (and file, if present)
+    for table_name in ("flow", "folder", "variable", "apikey", "file"):
+        if table_name == "file" and "file" not in existing_tables:
+            continue
+        add_tenant_columns(
+            table_name,
+            [sa.Column("tenant_id", sa.String(), nullable=True)],
+            f"fk_{table_name}_tenant",
+            f"ix_{table_name}_tenant_id",
+        )
 
 
 def downgrade() -> None:
-    # Remove tenant_id from file table
-    op.drop_index(op.f("ix_file_tenant_id"), table_name="file")
-    op.drop_constraint("fk_file_tenant", "file", type_="foreignkey")
-    op.drop_column("file", "tenant_id")
-
-    # Remove tenant_id from apikey table
-    op.drop_index(op.f("ix_apikey_tenant_id"), table_name="apikey")
-    op.drop_constraint("fk_apikey_tenant", "apikey", type_="foreignkey")
-    op.drop_column("apikey", "tenant_id")
-
-    # Remove tenant_id from variable table
-    op.drop_index(op.f("ix_variable_tenant_id"), table_name="variable")
-    op.drop_constraint("fk_variable_tenant", "variable", type_="foreignkey")
-    op.drop_column("variable", "tenant_id")
-
-    # Remove tenant_id from folder table
-    op.drop_index(op.f("ix_folder_tenant_id"), table_name="folder")
-    op.drop_constraint("fk_folder_tenant", "folder", type_="foreignkey")
-    op.drop_column("folder", "tenant_id")
-
-    # Remove tenant_id from flow table
-    op.drop_index(op.f("ix_flow_tenant_id"), table_name="flow")
-    op.drop_constraint("fk_flow_tenant", "flow", type_="foreignkey")
-    op.drop_column("flow", "tenant_id")
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+
+    # Helper function to drop tenant columns, their foreign key and index from a table.
+    # Batch mode applies them together, so SQLite rebuilds the table once instead of per operation.
+    def drop_tenant_columns(table_name, column_names, fk_name, index_name):
+        if table_name not in existing_tables:
+            return
+        existing_columns = {col["name"] for col in inspector.get_columns(table_name)}
+        existing_fks = {fk["name"] for fk in inspector.get_foreign_keys(table_name)}
+        existing_indexes = {idx["name"] for idx in inspector.get_indexes(table_name)}
+
+        with op.batch_alter_table(table_name) as batch_op:
+            if index_name in existing_indexes:
+                batch_op.drop_index(index_name)
+            if fk_name in existing_fks:
+                batch_op.drop_constraint(fk_name, type_="foreignkey")
+            for column_name in column_names:
+                if column_name in existing_columns:
+                    batch_op.drop_column(column_name)
+
+    # Remove tenant_id from file, apikey, variable, folder and flow tables
+    for table_name in ("file", "apikey", "variable", "folder", "flow"):
+        drop_tenant_columns(table_name, ["tenant_id"], f"fk_{table_name}_tenant", f"ix_{table_name}_tenant_id")
 
     # Remove tenant_id and is_tenant_admin from user table
-    op.drop_index(op.f("ix_user_tenant_id"), table_name="user")
-    op.drop_constraint("fk_user_tenant", "user", type_="foreignkey")
-    op.drop_column("user", "is_tenant_admin")
-    op.drop_column("user", "tenant_id")
+    drop_tenant_columns("user", ["is_tenant_admin", "tenant_id"], "fk_user_tenant", "ix_user_tenant_id")
 
     # Drop user_usage_stats table
-    op.drop_index(op.f("ix_user_usage_stats_stats_date"), table_name="user_usage_stats")
-    op.drop_index(op.f("ix_user_usage_stats_tenant_id"), table_name="user_usage_stats")
-    op.drop_index(op.f("ix_user_usage_stats_user_id"), table_name="user_usage_stats")
+    op.drop_index("ix_user_usage_stats_stats_date", table_name="user_usage_stats")
+    op.drop_index("ix_user_usage_stats_tenant_id", table_name="user_usage_stats")
+    op.drop_index("ix_user_usage_stats_user_id", table_name="user_usage_stats")
     op.drop_table("user_usage_stats")
 
     # Drop tenant_usage_stats table
-    op.drop_index(op.f("ix_tenant_usage_stats_stats_date"), table_name="tenant_usage_stats")
-    op.drop_index(op.f("ix_tenant_usage_stats_tenant_id"), table_name="tenant_usage_stats")
+    op.drop_index("ix_tenant_usage_stats_stats_date", table_name="tenant_usage_stats")
+    op.drop_index("ix_tenant_usage_stats_tenant_id", table_name="tenant_usage_stats")
     op.drop_table("tenant_usage_stats")
 
     # Drop license table
-    op.drop_index(op.f("ix_license_is_active"), table_name="license")
-    op.drop_index(op.f("ix_license_tier"), table_name="license")
-    op.drop_index(op.f("ix_license_license_type"), table_name="license")
-    op.drop_index(op.f("ix_license_tenant_id"), table_name="license")
+    op.drop_index("ix_license_is_active", table_name="license")
+    op.drop_index("ix_license_tier", table_name="license")
+    op.drop_index("ix_license_license_type", table_name="license")
+    op.drop_index("ix_license_tenant_id", table_name="license")
     op.drop_table("license")
 
     # Drop tenant table
-    op.drop_index(op.f("ix_tenant_is_active"), table_name="tenant")
-    op.drop_index(op.f("ix_tenant_slug"), table_name="tenant")
-    op.drop_index(op.f("ix_tenant_name"), table_name="tenant")
+    op.drop_index("ix_tenant_is_active", table_name="tenant")
+    op.drop_index("ix_tenant_slug", table_name="tenant")
+    op.drop_index("ix_tenant_name", table_name="tenant")
     op.drop_table("tenant")
 
@@ -6,55 +6,216 @@ Create Date: 2024-12-04 18:00:00.000000
 
 """
 
-from collections.abc import Sequence
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 
 import sqlalchemy as sa
+import sqlmodel
 from alembic import op
 from sqlalchemy.dialects import sqlite
 
+from kluisz.utils import migration
+
 # revision identifiers, used by Alembic.
 revision: str = "b1c2d3e4f5a6"
 down_revision: str | None = "b2c3d4e5f6a7"
 branch_labels: str | Sequence[str] | None = None
 depends_on: str | Sequence[str] | None = None
 
+SQLITE_CACHE_SIZE = -65536  # Page cache used during the upgrade on SQLite, in KiB (negative value)
+
+# period_start/period_end expressions derived from stats_date; SQLite's is the fallback
+PERIOD_BOUNDS = {
+    "postgresql": ("stats_date::timestamptz", "(stats_date + interval '1 day' - interval '1 second')::timestamptz"),
+    "sqlite": ("datetime(stats_date)", "datetime(stats_date, '+86399 seconds')"),
+}
+BACKFILL_PERIODS = """
+    UPDATE {table}
+    SET period_start = {period_start},
+        period_end = {period_end}
+    WHERE period_start IS NULL AND stats_date IS NOT NULL
+"""
+
+
+@contextmanager
+def _sqlite_large_page_cache(conn) -> Iterator[None]:
+    """Give SQLite a larger page cache for the duration of the block.
+
+    The table rebuilds and index builds below touch every page of the affected tables. Once the
+    default cache fills up, SQLite spills dirty pages mid-transaction, which syncs the rollback
+    journal each time. synchronous, journal_mode and temp_store cannot be changed inside the
+    migration transaction, but cache_size can.
+    """
+    if conn.dialect.name != "sqlite":
+        yield
+        return
+    previous = conn.exec_driver_sql("PRAGMA cache_size").scalar()
+    conn.exec_driver_sql(f"PRAGMA cache_size = {SQLITE_CACHE_SIZE}")
+    try:
+        yield
+    finally:
+        conn.exec_driver_sql(f"PRAGMA cache_size = {int(previous)}")
+
+
+@dataclass
+class _UpgradeState:
+    """Reflection caches and deferred operations shared by the upgrade helpers below."""
+
+    conn: sa.Connection
+    inspector: sa.Inspector
+    existing_tables: set[str]
+    # Column names of the existing tables this migration extends, reflected once up front
+    column_cache: dict[str, set[str]]
+    # Index names per table, reflected at most once per table and kept up to date on create
+    index_cache: dict[str, set[str]] = field(default_factory=dict)
+    # Indexes left INVALID by a failed concurrent build; they count as missing and are rebuilt
+    invalid_indexes: set[str] = field(default_factory=set)
+    # Tables created by this migration; they are empty, so their indexes need no concurrent build
+    created_tables: set[str] = field(default_factory=set)
+    # Indexes on pre-existing tables, built concurrently in one pass near the end on PostgreSQL
+    pending_indexes: list[tuple[str, str, list[str], dict]] = field(default_factory=list)
+    # Foreign keys collected while extending tables and created last, once all columns, indexes
+    # and data migrations are in place
+    pending_fks: list[tuple[str, str, str, list[str], list[str]]] = field(default_factory=list)
+
+    @property
+    def concurrent_indexes(self) -> bool:
+        return self.conn.dialect.name == "postgresql"
+
+    def get_indexes(self, table_name: str) -> set[str]:
+        if table_name not in self.index_cache:
+            self.index_cache[table_name] = {
+                idx["name"] for idx in self.inspector.get_indexes(table_name) if idx["name"] not in self.invalid_indexes
+            }
+        return self.index_cache[table_name]
+
+
+def _safe_create_table(state: _UpgradeState, table_name, *args, **kwargs):
+    if table_name in state.existing_tables:
+        return
+    op.create_table(table_name, *args, **kwargs)
+    state.existing_tables.add(table_name)
+    state.created_tables.add(table_name)
+    state.index_cache[table_name] = set()
+
+
+def _safe_create_index(state: _UpgradeState, index_name, table_name, columns, **kwargs):
+    if index_name in state.get_indexes(table_name):
+        return
+    if state.concurrent_indexes and table_name not in state.created_tables:
+        # Pre-existing, possibly large tables get their indexes built without blocking writes
+        state.pending_indexes.append((index_name, table_name, columns, kwargs))
+    else:
+        op.create_index(index_name, table_name, columns, **kwargs)
+    state.index_cache[table_name].add(index_name)
+
+
+def _batch_add_columns(state: _UpgradeState, table_name, columns, indexes=(), foreign_keys=(), nullable_columns=()):
+    """Add the missing columns and indexes of an existing table and queue its missing foreign keys.
+
+    The given existing columns are made nullable as well. Batch mode applies everything together,
+    so SQLite rebuilds the table once instead of per operation.
+    """
+    conn = state.conn
+    existing_fks = {fk["name"] for fk in state.inspector.get_foreign_keys(table_name)}
+    existing_indexes = state.get_indexes(table_name)
+
+    new_columns = [column for column in columns if column.name not in state.column_cache[table_name]]
+    new_indexes = [index for index in indexes if index[0] not in existing_indexes]
+    state.pending_fks.extend((fk[0], table_name, *fk[1:]) for fk in foreign_keys if fk[0] not in existing_fks)
+    if not (new_columns or new_indexes or nullable_columns):
+        return
+
+    if state.concurrent_indexes:
+        # On PostgreSQL all column changes go into one ALTER TABLE: a single lock acquisition and
+        # catalog update. DROP NOT NULL only touches the catalog as well.
+        quote = conn.dialect.identifier_preparer.quote
+        clauses = [
+            f"ADD COLUMN {sa.schema.CreateColumn(column).compile(dialect=conn.dialect)}" for column in new_columns
+        ]
+        clauses.extend(f"ALTER COLUMN {quote(column_name)} DROP NOT NULL" for column_name in nullable_columns)
+        if clauses:
+            op.execute(f"ALTER TABLE {quote(table_name)} " + ", ".join(clauses))
+    else:
+        with op.batch_alter_table(table_name) as batch_op:
+            for column in new_columns:
+                batch_op.add_column(column)
+            for column_name in nullable_columns:
+                batch_op.alter_column(column_name, nullable=True)
+            for index_name, index_columns, unique in new_indexes:
+                batch_op.create_index(index_name, index_columns, unique=unique)
+    state.column_cache[table_name].update(column.name for column in new_columns)
+    if state.concurrent_indexes:
+        for index_name, index_columns, unique in new_indexes:
+            _safe_create_index(state, index_name, table_name, index_columns, unique=unique)
+    else:
+        existing_indexes.update(index[0] for index in new_indexes)
+
+
+def _backfill_periods(state: _UpgradeState, table_name):
+    """Convert stats_date into period_start/period_end with a single UPDATE.
+
+    The UPDATE runs in the migration transaction, so a failure rolls it back together with the
+    columns it fills. Splitting it into batches inside that transaction would keep the same locks
+    and WAL until commit, and each batch would scan the table again for unfilled rows.
+    """
+    conn = state.conn
+    period_start, period_end = PERIOD_BOUNDS.get(conn.dialect.name, PERIOD_BOUNDS["sqlite"])
+    conn.execute(sa.text(BACKFILL_PERIODS.format(table=table_name, period_start=period_start, period_end=period_end)))
+
+
+def _replace_unique_constraint(state: _UpgradeState, table_name, old_name, new_name, columns):
+    """Swap the unique constraint of a table, in one batch so SQLite rebuilds it once."""
+    unique_constraints = {uq["name"] for uq in state.inspector.get_unique_constraints(table_name)}
+    drop_old = old_name in unique_constraints
+    create_new = new_name not in unique_constraints
+    if not (drop_old or create_new):
+        return
+    with op.batch_alter_table(table_name) as batch_op:
+        if drop_old:
+            batch_op.drop_constraint(old_name, type_="unique")
+        if create_new:
+            batch_op.create_unique_constraint(new_name, columns)
+
+
+def _safe_drop_table(state: _UpgradeState, table_name):
+    if table_name in state.existing_tables:
+        op.drop_table(table_name)
+        state.existing_tables.discard(table_name)
+
 
 def upgrade() -> None:
+    with _sqlite_large_page_cache(op.get_bind()):
+        _upgrade()
+
+
+def _upgrade() -> None:
     conn = op.get_bind()
     inspector = sa.inspect(conn)
-    existing_tables = inspector.get_table_names()
-    
-    # Helper functions
-    def safe_create_table(table_name, *args, **kwargs):
-        if table_name not in existing_tables:
-            try:
-                op.create_table(table_name, *args, **kwargs)
-            except Exception:
-                pass
-    
-    def safe_add_column(table_name, column):
-        try:
-            op.add_column(table_name, column)
-        except Exception:
-            pass
-    
-    def safe_create_index(index_name, table_name, columns, **kwargs):
-        try:
-            existing_indexes = [idx["name"] for idx in inspector.get_indexes(table_name)]
-            if index_name not in existing_indexes:
-                op.create_index(index_name, table_name, columns, **kwargs)
-        except Exception:
-            pass
-    
-    def safe_drop_table(table_name):
-        if table_name in existing_tables:
-            try:
-                op.drop_table(table_name)
-            except Exception:
-                pass
-    
-    # 1. Create license_tier table
-    safe_create_table(
+    existing_tables: set[str] = set(inspector.get_table_names())
+    state = _UpgradeState(
+        conn=conn,
+        inspector=inspector,
+        existing_tables=existing_tables,
+        column_cache={
+            table: {col["name"] for col in inspector.get_columns(table)}
+            for table in ("user", "tenant", "transaction", "tenant_usage_stats", "user_usage_stats")
+            if table in existing_tables
+        },
+        invalid_indexes=migration.invalid_indexes(conn),
+    )
+
+    # 1. Drop old redundant tables (if they exist) first, so their space is freed before the
+    # tables below are extended
+    _safe_drop_table(state, "user_license")
+    _safe_drop_table(state, "license_pool")
+    _safe_drop_table(state, "credit_transaction")
+    # Note: license table is disabled (table=False) but not dropped for backward compatibility
+
+    # 2. Create license_tier table
+    _safe_create_table(
+        state,
         "license_tier",
         sa.Column("id", sa.String(), nullable=False),
         sa.Column("name", sa.String(), nullable=False),
@@ -75,11 +236,12 @@ def upgrade() -> None:
         sa.PrimaryKeyConstraint("id"),
         sa.UniqueConstraint("name"),
     )
-    safe_create_index("ix_license_tier_name", "license_tier", ["name"], unique=True)
-    safe_create_index("ix_license_tier_is_active", "license_tier", ["is_active"], unique=False)
-    
-    # 2. Create subscription table
-    safe_create_table(
+    _safe_create_index(state, "ix_license_tier_name", "license_tier", ["name"], unique=True)
+    _safe_create_index(state, "ix_license_tier_is_active", "license_tier", ["is_active"], unique=False)
+
+    # 3. Create subscription table
+    _safe_create_table(
+        state,
         "subscription",
         sa.Column("id", sa.String(), nullable=False),
         sa.Column("tenant_id", sa.String(), nullable=False),
@@ -103,13 +265,14 @@ def upgrade() -> None:
         sa.ForeignKeyConstraint(["tenant_id"], ["tenant.id"]),
         sa.ForeignKeyConstraint(["tier_id"], ["license_tier.id"]),
     )
-    safe_create_index("ix_subscription_tenant_id", "subscription", ["tenant_id"], unique=False)
-    safe_create_index("ix_subscription_status", "subscription", ["status"], unique=False)
-    safe_create_index("ix_subscription_renewal_date", "subscription", ["renewal_date"], unique=False)
-    safe_create_index("ix_subscription_next_payment_date", "subscription", ["next_payment_date"], unique=False)
-    
-    # 3. Create subscription_history table
-    safe_create_table(
+    _safe_create_index(state, "ix_subscription_tenant_id", "subscription", ["tenant_id"], unique=False)
+    _safe_create_index(state, "ix_subscription_status", "subscription", ["status"], unique=False)
+    _safe_create_index(state, "ix_subscription_renewal_date", "subscription", ["renewal_date"], unique=False)
+    _safe_create_index(state, "ix_subscription_next_payment_date", "subscription", ["next_payment_date"], unique=False)
+
+    # 4. Create subscription_history table
+    _safe_create_table(
+        state,
         "subscription_history",
         sa.Column("id", sa.String(), nullable=False),
         sa.Column("subscription_id", sa.String(), nullable=False),
@@ -122,218 +285,280 @@ def upgrade() -> None:
         sa.Column("old_amount", sa.Numeric(precision=10, scale=2), nullable=True),
         sa.Column("new_amount", sa.Numeric(precision=10, scale=2), nullable=True),
         sa.Column("reason", sa.Text(), nullable=True),
-        sa.Column("changed_by", sa.String(), nullable=True),
+        sa.Column("changed_by", sqlmodel.sql.sqltypes.types.Uuid(), nullable=True),
         sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
         sa.PrimaryKeyConstraint("id"),
         sa.ForeignKeyConstraint(["subscription_id"], ["subscription.id"]),
         sa.ForeignKeyConstraint(["tenant_id"], ["tenant.id"]),
         sa.ForeignKeyConstraint(["changed_by"], ["user.id"]),
     )
-    safe_create_index("ix_subscription_history_subscription_id", "subscription_history", ["subscription_id"], unique=False)
-    safe_create_index("ix_subscription_history_tenant_id", "subscription_history", ["tenant_id"], unique=False)
-    safe_create_index("ix_subscription_history_action", "subscription_history", ["action"], unique=False)
-    
-    # 4. Add license fields to user table
+    _safe_create_index(
+        state, "ix_subscription_history_subscription_id", "subscription_history", ["subscription_id"], unique=False
+    )
+    _safe_create_index(state, "ix_subscription_history_tenant_id", "subscription_history", ["tenant_id"], unique=False)
+    _safe_create_index(state, "ix_subscription_history_action", "subscription_history", ["action"], unique=False)
+
+    # 5. Add license fields to user table
     if "user" in existing_tables:
-        safe_add_column("user", sa.Column("license_pool_id", sa.String(), nullable=True))
-        safe_add_column("user", sa.Column("license_tier_id", sa.String(), nullable=True))
-        safe_add_column("user", sa.Column("credits_allocated", sa.Integer(), nullable=False, server_default="0"))
-        safe_add_column("user", sa.Column("credits_used", sa.Integer(), nullable=False, server_default="0"))
-        safe_add_column("user", sa.Column("credits_per_month", sa.Integer(), nullable=True))
-        safe_add_column("user", sa.Column("license_assigned_at", sa.DateTime(timezone=True), nullable=True))
-        safe_add_column("user", sa.Column("license_assigned_by", sa.String(), nullable=True))
-        safe_add_column("user", sa.Column("license_expires_at", sa.DateTime(timezone=True), nullable=True))
-        safe_add_column("user", sa.Column("license_is_active", sa.Boolean(), nullable=False, server_default="0"))
-        
-        safe_create_index("ix_user_license_pool_id", "user", ["license_pool_id"], unique=False)
-        safe_create_index("ix_user_license_tier_id", "user", ["license_tier_id"], unique=False)
-        safe_create_index("ix_user_license_is_active", "user", ["license_is_active"], unique=False)
-        
-        # Add foreign keys
-        try:
-            op.create_foreign_key("fk_user_license_tier_id", "user", "license_tier", ["license_tier_id"], ["id"])
-        except Exception:
-            pass
-        try:
-            op.create_foreign_key("fk_user_license_assigned_by", "user", "user", ["license_assigned_by"], ["id"])
-        except Exception:
-            pass
-    
-    # 5. Add license_pools JSON and subscription fields to tenant table
+        _batch_add_columns(
+            state,
+            "user",
+            [
+                sa.Column("license_pool_id", sa.String(), nullable=True),
+                sa.Column("license_tier_id", sa.String(), nullable=True),
+                sa.Column("credits_allocated", sa.Integer(), nullable=False, server_default="0"),
+                sa.Column("credits_used", sa.Integer(), nullable=False, server_default="0"),
+                sa.Column("credits_per_month", sa.Integer(), nullable=True),
+                sa.Column("license_assigned_at", sa.DateTime(timezone=True), nullable=True),
+                sa.Column("license_assigned_by", sqlmodel.sql.sqltypes.types.Uuid(), nullable=True),
+                sa.Column("license_expires_at", sa.DateTime(timezone=True), nullable=True),
+                sa.Column("license_is_active", sa.Boolean(), nullable=False, server_default="0"),
+            ],
+            indexes=[
+                ("ix_user_license_pool_id", ["license_pool_id"], False),
+                ("ix_user_license_tier_id", ["license_tier_id"], False),
+                ("ix_user_license_is_active", ["license_is_active"], False),
+            ],
+            foreign_keys=[
+                ("fk_user_license_tier_id", "license_tier", ["license_tier_id"], ["id"]),
+                ("fk_user_license_assigned_by", "user", ["license_assigned_by"], ["id"]),
+            ],
+        )
+
+    # 6. Add license_pools JSON and subscription fields to tenant table
     if "tenant" in existing_tables:
-        safe_add_column("tenant", sa.Column("license_pools", sa.JSON(), nullable=True, server_default="{}"))
-        safe_add_column("tenant", sa.Column("subscription_tier_id", sa.String(), nullable=True))
-        safe_add_column("tenant", sa.Column("subscription_license_count", sa.Integer(), nullable=False, server_default="0"))
-        safe_add_column("tenant", sa.Column("subscription_status", sa.String(), nullable=True))
-        safe_add_column("tenant", sa.Column("subscription_start_date", sa.DateTime(timezone=True), nullable=True))
-        safe_add_column("tenant", sa.Column("subscription_end_date", sa.DateTime(timezone=True), nullable=True))
-        safe_add_column("tenant", sa.Column("subscription_renewal_date", sa.DateTime(timezone=True), nullable=True))
-        safe_add_column("tenant", sa.Column("subscription_payment_method_id", sa.String(), nullable=True))
-        safe_add_column("tenant", sa.Column("subscription_amount", sa.Numeric(precision=10, scale=2), nullable=True))
-        safe_add_column("tenant", sa.Column("subscription_currency", sa.String(), nullable=False, server_default="USD"))
-        
-        safe_create_index("ix_tenant_subscription_tier_id", "tenant", ["subscription_tier_id"], unique=False)
-        safe_create_index("ix_tenant_subscription_status", "tenant", ["subscription_status"], unique=False)
-        safe_create_index("ix_tenant_subscription_renewal_date", "tenant", ["subscription_renewal_date"], unique=False)
-        
-        # Add foreign key
-        try:
-            op.create_foreign_key("fk_tenant_subscription_tier_id", "tenant", "license_tier", ["subscription_tier_id"], ["id"])
-        except Exception:
-            pass
-    
-    # 6. Add credit transaction fields to transaction table
+        _batch_add_columns(
+            state,
+            "tenant",
+            [
+                sa.Column("license_pools", sa.JSON(), nullable=True, server_default="{}"),
+                sa.Column("subscription_tier_id", sa.String(), nullable=True),
+                sa.Column("subscription_license_count", sa.Integer(), nullable=False, server_default="0"),
+                sa.Column("subscription_status", sa.String(), nullable=True),
+                sa.Column("subscription_start_date", sa.DateTime(timezone=True), nullable=True),
+                sa.Column("subscription_end_date", sa.DateTime(timezone=True), nullable=True),
+                sa.Column("subscription_renewal_date", sa.DateTime(timezone=True), nullable=True),
+                sa.Column("subscription_payment_method_id", sa.String(), nullable=True),
+                sa.Column("subscription_amount", sa.Numeric(precision=10, scale=2), nullable=True),
+                sa.Column("subscription_currency", sa.String(), nullable=False, server_default="USD"),
+            ],
+            indexes=[
+                ("ix_tenant_subscription_tier_id", ["subscription_tier_id"], False),
+                ("ix_tenant_subscription_status", ["subscription_status"], False),
+                ("ix_tenant_subscription_renewal_date", ["subscription_renewal_date"], False),
+            ],
+            foreign_keys=[
+                ("fk_tenant_subscription_tier_id", "license_tier", ["subscription_tier_id"], ["id"]),
+            ],
+        )
+
+    # 7. Add credit transaction fields to transaction table
     if "transaction" in existing_tables:
-        safe_add_column("transaction", sa.Column("user_id", sa.String(), nullable=True))
-        safe_add_column("transaction", sa.Column("transaction_type", sa.String(), nullable=True))
-        safe_add_column("transaction", sa.Column("credits_amount", sa.Integer(), nullable=True))
-        safe_add_column("transaction", sa.Column("credits_before", sa.Integer(), nullable=True))
-        safe_add_column("transaction", sa.Column("credits_after", sa.Integer(), nullable=True))
-        safe_add_column("transaction", sa.Column("usage_record_id", sa.String(), nullable=True))
-        safe_add_column("transaction", sa.Column("transaction_metadata", sa.JSON(), nullable=True))
-        safe_add_column("transaction", sa.Column("created_by", sa.String(), nullable=True))
-        
-        safe_create_index("ix_transaction_user_id", "transaction", ["user_id"], unique=False)
-        safe_create_index("ix_transaction_transaction_type", "transaction", ["transaction_type"], unique=False)
-        
-        # Make existing fields nullable for credit transactions
-        try:
-            op.alter_column("transaction", "vertex_id", nullable=True)
-            op.alter_column("transaction", "status", nullable=True)
-            op.alter_column("transaction", "flow_id", nullable=True)
-        except Exception:
-            pass
-        
-        # Add foreign keys
-        try:
-            op.create_foreign_key("fk_transaction_user_id", "transaction", "user", ["user_id"], ["id"])
-        except Exception:
-            pass
-        try:
-            op.create_foreign_key("fk_transaction_created_by", "transaction", "user", ["created_by"], ["id"])
-        except Exception:
-            pass
-    
-    # 7. Update tenant_usage_stats table
+        # Existing fields that must become nullable for credit transactions
+        transaction_columns = {col["name"]: col for col in inspector.get_columns("transaction")}
+        required_columns = [
+            name
+            for name in ("vertex_id", "status", "flow_id")
+            if name in transaction_columns and not transaction_columns[name]["nullable"]
+        ]
+
+        _batch_add_columns(
+            state,
+            "transaction",
+            [
+                sa.Column("user_id", sqlmodel.sql.sqltypes.types.Uuid(), nullable=True),
+                sa.Column("transaction_type", sa.String(), nullable=True),
+                sa.Column("credits_amount", sa.Integer(), nullable=True),
+                sa.Column("credits_before", sa.Integer(), nullable=True),
+                sa.Column("credits_after", sa.Integer(), nullable=True),
+                sa.Column("usage_record_id", sa.String(), nullable=True),
+                sa.Column("transaction_metadata", sa.JSON(), nullable=True),
+                sa.Column("created_by", sqlmodel.sql.sqltypes.types.Uuid(), nullable=True),
+            ],
+            indexes=[
+                ("ix_transaction_user_id", ["user_id"], False),
+                ("ix_transaction_transaction_type", ["transaction_type"], False),
+            ],
+            foreign_keys=[
+                ("fk_transaction_user_id", "user", ["user_id"], ["id"]),
+                ("fk_transaction_created_by", "user", ["created_by"], ["id"]),
+            ],
+            nullable_columns=required_columns,
+        )
+
+    # 8. Update tenant_usage_stats table
     if "tenant_usage_stats" in existing_tables:
-        # Drop old unique constraint if exists
-        try:
-            op.drop_constraint("uq_tenant_usage_stats_tenant_date", "tenant_usage_stats", type_="unique")
-        except Exception:
-            pass
-        
         # Add new columns
-        safe_add_column("tenant_usage_stats", sa.Column("period_start", sa.DateTime(timezone=True), nullable=True))
-        safe_add_column("tenant_usage_stats", sa.Column("period_end", sa.DateTime(timezone=True), nullable=True))
-        safe_add_column("tenant_usage_stats", sa.Column("total_credits_used", sa.Integer(), nullable=False, server_default="0"))
-        safe_add_column("tenant_usage_stats", sa.Column("total_traces", sa.Integer(), nullable=False, server_default="0"))
-        safe_add_column("tenant_usage_stats", sa.Column("total_cost_usd", sa.Numeric(precision=10, scale=2), nullable=False, server_default="0.00"))
-        safe_add_column("tenant_usage_stats", sa.Column("active_users_count", sa.Integer(), nullable=False, server_default="0"))
-        
+        _batch_add_columns(
+            state,
+            "tenant_usage_stats",
+            [
+                sa.Column("period_start", sa.DateTime(timezone=True), nullable=True),
+                sa.Column("period_end", sa.DateTime(timezone=True), nullable=True),
+                sa.Column("total_credits_used", sa.Integer(), nullable=False, server_default="0"),
+                sa.Column("total_traces", sa.Integer(), nullable=False, server_default="0"),
+                sa.Column("total_cost_usd", sa.Numeric(precision=10, scale=2), nullable=False, server_default="0.00"),
+                sa.Column("active_users_count", sa.Integer(), nullable=False, server_default="0"),
+            ],
+        )
+
         # Migrate data: convert stats_date to period_start/period_end
-        try:
-            conn.execute(sa.text("""
-                UPDATE tenant_usage_stats 
-                SET period_start = datetime(stats_date || ' 00:00:00'),
-                    period_end = datetime(stats_date || ' 23:59:59')
-                WHERE period_start IS NULL
-            """))
-        except Exception:
-            pass
-        
-        # Create new unique constraint
-        try:
-            op.create_unique_constraint("uq_tenant_usage_stats_tenant_period", "tenant_usage_stats", ["tenant_id", "period_start", "period_end"])
-        except Exception:
-            pass
-        
-        safe_create_index("ix_tenant_usage_stats_period", "tenant_usage_stats", ["period_start", "period_end"], unique=False)
-    
-    # 8. Update user_usage_stats table
+        _backfill_periods(state, "tenant_usage_stats")
+
+        # Replace the per-day unique constraint with one per period
+        _replace_unique_constraint(
+            state,
+            "tenant_usage_stats",
+            "uq_tenant_usage_stats_tenant_date",
+            "uq_tenant_usage_stats_tenant_period",
+            ["tenant_id", "period_start", "period_end"],
+        )
+
+        _safe_create_index(
+            state, "ix_tenant_usage_stats_period", "tenant_usage_stats", ["period_start", "period_end"], unique=False
+        )
+
+    # 9. Update user_usage_stats table
     if "user_usage_stats" in existing_tables:
-        # Drop old unique constraint if exists
-        try:
-            op.drop_constraint("uq_user_usage_stats_user_date", "user_usage_stats", type_="unique")
-        except Exception:
-            pass
-        
         # Add new columns
-        safe_add_column("user_usage_stats", sa.Column("period_start", sa.DateTime(timezone=True), nullable=True))
-        safe_add_column("user_usage_stats", sa.Column("period_end", sa.DateTime(timezone=True), nullable=True))
-        safe_add_column("user_usage_stats", sa.Column("traces_count", sa.Integer(), nullable=False, server_default="0"))
-        safe_add_column("user_usage_stats", sa.Column("cost_usd", sa.Numeric(precision=10, scale=2), nullable=False, server_default="0.00"))
-        
+        _batch_add_columns(
+            state,
+            "user_usage_stats",
+            [
+                sa.Column("period_start", sa.DateTime(timezone=True), nullable=True),
+                sa.Column("period_end", sa.DateTime(timezone=True), nullable=True),
+                sa.Column("traces_count", sa.Integer(), nullable=False, server_default="0"),
+                sa.Column("cost_usd", sa.Numeric(precision=10, scale=2), nullable=False, server_default="0.00"),
+            ],
+        )
+
         # Migrate data: convert stats_date to period_start/period_end
-        try:
-            conn.execute(sa.text("""
-                UPDATE user_usage_stats 
-                SET period_start = datetime(stats_date || ' 00:00:00'),
-                    period_end = datetime(stats_date || ' 23:59:59')
-                WHERE period_start IS NULL
-            """))
-        except Exception:
-            pass
-        
-        # Create new unique constraint
-        try:
-            op.create_unique_constraint("uq_user_usage_stats_user_period", "user_usage_stats", ["user_id", "period_start", "period_end"])
-        except Exception:
-            pass
-        
-        safe_create_index("ix_user_usage_stats_period", "user_usage_stats", ["period_start", "period_end"], unique=False)
-    
-    # 9. Drop old redundant tables (if they exist)
-    safe_drop_table("user_license")
-    safe_drop_table("license_pool")
-    safe_drop_table("credit_transaction")
-    # Note: license table is disabled (table=False) but not dropped for backward compatibility
+        _backfill_periods(state, "user_usage_stats")
+
+        # Replace the per-day unique constraint with one per period
+        _replace_unique_constraint(
+            state,
+            "user_usage_stats",
+            "uq_user_usage_stats_user_date",
+            "uq_user_usage_stats_user_period",
+            ["user_id", "period_start", "period_end"],
+        )
+
+        _safe_create_index(
+            state, "ix_user_usage_stats_period", "user_usage_stats", ["period_start", "period_end"], unique=False
+        )
+
+    # 10. Build the queued indexes concurrently. CREATE INDEX CONCURRENTLY cannot run inside a
+    # transaction block, so they share a single autocommit block, which keeps the migration lock.
+    if state.pending_indexes:
+        with migration.autocommit_block():
+            for index_name, table_name, columns, kwargs in state.pending_indexes:
+                migration.create_index_concurrently(index_name, table_name, columns, **kwargs)
+
+    # 11. Create the foreign keys queued above. SQLite can only add them by rebuilding each table
+    # again, so they are skipped there. PostgreSQL adds them NOT VALID, which skips scanning the
+    # existing rows under the ALTER TABLE lock, and validates them afterwards outside the migration
+    # transaction, where VALIDATE CONSTRAINT does not block writers.
+    if conn.dialect.name == "postgresql":
+        for fk_name, table_name, ref_table, local_cols, ref_cols in state.pending_fks:
+            op.create_foreign_key(fk_name, table_name, ref_table, local_cols, ref_cols, postgresql_not_valid=True)
+        if state.pending_fks:
+            quote = conn.dialect.identifier_preparer.quote
+            with migration.autocommit_block():
+                for fk_name, table_name, *_ in state.pending_fks:
+                    op.execute(f"ALTER TABLE {quote(table_name)} VALIDATE CONSTRAINT {quote(fk_name)}")
+    elif conn.dialect.name != "sqlite":
+        for fk_name, table_name, ref_table, local_cols, ref_cols in state.pending_fks:
+            op.create_foreign_key(fk_name, table_name, ref_table, local_cols, ref_cols)
 
 
 def downgrade() -> None:
-    # Reverse operations
-    op.drop_table("subscription_history")
-    op.drop_table("subscription")
-    op.drop_table("license_tier")
-    
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existing_tables = set(inspector.get_table_names())
+
+    # Helper function to drop columns together with the indexes and foreign keys on them. PostgreSQL
+    # drops those along with the columns in a single ALTER TABLE; SQLite rebuilds the table once
+    # for the whole batch.
+    def batch_drop_columns(table_name, column_names):
+        if table_name not in existing_tables:
+            return
+        existing_columns = {col["name"] for col in inspector.get_columns(table_name)}
+        drop_columns = [name for name in column_names if name in existing_columns]
+        if not drop_columns:
+            return
+
+        if conn.dialect.name == "postgresql":
+            quote = conn.dialect.identifier_preparer.quote
+            op.execute(
+                f"ALTER TABLE {quote(table_name)} " + ", ".join(f"DROP COLUMN {quote(name)}" for name in drop_columns)
+            )
+            return
+
+        dropped = set(drop_columns)
+        indexes = [idx["name"] for idx in inspector.get_indexes(table_name) if dropped & set(idx["column_names"])]
+        fks = [
+            fk["name"]
+            for fk in inspector.get_foreign_keys(table_name)
+            if fk["name"] and dropped & set(fk["constrained_columns"])
+        ]
+        with op.batch_alter_table(table_name) as batch_op:
+            for index_name in indexes:
+                batch_op.drop_index(index_name)
+            for fk_name in fks:
+                batch_op.drop_constraint(fk_name, type_="foreignkey")
+            for name in drop_columns:
+                batch_op.drop_column(name)
+
     # Remove columns from user table
-    try:
-        op.drop_column("user", "license_pool_id")
-        op.drop_column("user", "license_tier_id")
-        op.drop_column("user", "credits_allocated")
-        op.drop_column("user", "credits_used")
-        op.drop_column("user", "credits_per_month")
-        op.drop_column("user", "license_assigned_at")
-        op.drop_column("user", "license_assigned_by")
-        op.drop_column("user", "license_expires_at")
-        op.drop_column("user", "license_is_active")
-    except Exception:
-        pass
-    
+    batch_drop_columns(
+        "user",
+        [
+            "license_pool_id",
+            "license_tier_id",
+            "credits_allocated",
+            "credits_used",
+            "credits_per_month",
+            "license_assigned_at",
+            "license_assigned_by",
+            "license_expires_at",
+            "license_is_active",
+        ],
+    )
+
     # Remove columns from tenant table
-    try:
-        op.drop_column("tenant", "license_pools")
-        op.drop_column("tenant", "subscription_tier_id")
-        op.drop_column("tenant", "subscription_license_count")
-        op.drop_column("tenant", "subscription_status")
-        op.drop_column("tenant", "subscription_start_date")
-        op.drop_column("tenant", "subscription_end_date")
-        op.drop_column("tenant", "subscription_renewal_date")
-        op.drop_column("tenant", "subscription_payment_method_id")
-        op.drop_column("tenant", "subscription_amount")
-        op.drop_column("tenant", "subscription_currency")
-    except Exception:
-        pass
-    
+    batch_drop_columns(
+        "tenant",
+        [
+            "license_pools",
+            "subscription_tier_id",
+            "subscription_license_count",
+            "subscription_status",
+            "subscription_start_date",
+            "subscription_end_date",
+            "subscription_renewal_date",
+            "subscription_payment_method_id",
+            "subscription_amount",
+            "subscription_currency",
+        ],
+    )
+
     # Remove columns from transaction table
-    try:
-        op.drop_column("transaction", "user_id")
-        op.drop_column("transaction", "transaction_type")
-        op.drop_column("transaction", "credits_amount")
-        op.drop_column("transaction", "credits_before")
-        op.drop_column("transaction", "credits_after")
-        op.drop_column("transaction", "usage_record_id")
-        op.drop_column("transaction", "transaction_metadata")
-        op.drop_column("transaction", "created_by")
-    except Exception:
-        pass
+    batch_drop_columns(
+        "transaction",
+        [
+            "user_id",
+            "transaction_type",
+            "credits_amount",
+            "credits_before",
+            "credits_after",
+            "usage_record_id",
+            "transaction_metadata",
+            "created_by",
+        ],
+    )
 
+    # Drop the new tables last, once no foreign key on the columns above references license_tier
+    for table_name in ("subscription_history", "subscription", "license_tier"):
+        if table_name in existing_tables:
+            op.drop_table(table_name)
@@ -22,7 +22,7 @@ def upgrade() -> None:
     # Check if the column exists before renaming
     conn = op.get_bind()
     inspector = sa.inspect(conn)
-    columns = [col['name'] for col in inspector.get_columns('user')]
+    columns = {col['name'] for col in inspector.get_columns('user')}
     
     if 'is_superuser' in columns and 'is_platform_superadmin' not in columns:
         op.alter_column('user', 'is_superuser', new_column_name='is_platform_superadmin')
@@ -35,7 +35,7 @@ def downgrade() -> None:
     """Rename is_platform_superadmin column back to is_superuser."""
     conn = op.get_bind()
     inspector = sa.inspect(conn)
-    columns = [col['name'] for col in inspector.get_columns('user')]
+    columns = {col['name'] for col in inspector.get_columns('user')}
     
     if 'is_platform_superadmin' in columns and 'is_superuser' not in columns:
         op.alter_column('user', 'is_platform_superadmin', new_column_name='is_superuser')
@@ -0,0 +1,23 @@
+"""Merge the branches the feature control tables are built on
+
+Revision ID: b7f343be3e45
+Revises: 182e5471b900, 3162e83e485f, d37bc4322900
+Create Date: 2025-01-15 09:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+# revision identifiers, used by Alembic.
+revision: str = "b7f343be3e45"
+down_revision: str | Sequence[str] | None = ("182e5471b900", "3162e83e485f", "d37bc4322900")
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Merge-only revision, no schema changes."""
+
+
+def downgrade() -> None:
+    """Merge-only revision, no schema changes."""
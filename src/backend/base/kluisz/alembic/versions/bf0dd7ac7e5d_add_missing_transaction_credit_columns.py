@@ -0,0 +1,90 @@
+"""Add the credit transaction columns to transaction tables that lack them
+
+Revision ID: bf0dd7ac7e5d
+Revises: f6a7b8c9d0e1
+Create Date: 2026-10-17 05:40:00.000000
+
+b1c2d3e4f5a6 adds the credit transaction fields to an existing transaction
+table, but on a database built from migrations it runs before
+90be8e2ed91e creates that table. Such databases only get the fields here,
+typed like TransactionTable so they match a table created from the models.
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "bf0dd7ac7e5d"
+down_revision: str | None = "f6a7b8c9d0e1"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+CREDIT_COLUMNS = [
+    "user_id",
+    "transaction_type",
+    "credits_amount",
+    "credits_before",
+    "credits_after",
+    "usage_record_id",
+    "transaction_metadata",
+    "created_by",
+]
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if not inspector.has_table("transaction"):
+        return
+    columns = {column["name"]: column for column in inspector.get_columns("transaction")}
+    if "transaction_type" in columns:
+        return
+
+    with op.batch_alter_table("transaction") as batch_op:
+        batch_op.add_column(sa.Column("user_id", sqlmodel.sql.sqltypes.types.Uuid(), nullable=True))
+        batch_op.add_column(sa.Column("transaction_type", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("credits_amount", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("credits_before", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("credits_after", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("usage_record_id", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("transaction_metadata", sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column("created_by", sqlmodel.sql.sqltypes.types.Uuid(), nullable=True))
+        # Existing fields that must become nullable for credit transactions
+        for name in ("vertex_id", "status", "flow_id"):
+            if name in columns and not columns[name]["nullable"]:
+                batch_op.alter_column(name, existing_type=columns[name]["type"], nullable=True)
+        batch_op.create_index("ix_transaction_user_id", ["user_id"], unique=False)
+        batch_op.create_index("ix_transaction_transaction_type", ["transaction_type"], unique=False)
+        batch_op.create_foreign_key("fk_transaction_user_id", "user", ["user_id"], ["id"])
+        batch_op.create_foreign_key("fk_transaction_created_by", "user", ["created_by"], ["id"])
+
+
+def downgrade() -> None:
+    # Drops the fields whichever revision added them; b1c2d3e4f5a6's downgrade skips missing ones.
+    # vertex_id, status and flow_id stay nullable, as rows without them may exist by now.
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if not inspector.has_table("transaction"):
+        return
+    existing_columns = {column["name"] for column in inspector.get_columns("transaction")}
+    drop_columns = [name for name in CREDIT_COLUMNS if name in existing_columns]
+    if not drop_columns:
+        return
+
+    dropped = set(drop_columns)
+    indexes = [idx["name"] for idx in inspector.get_indexes("transaction") if dropped & set(idx["column_names"])]
+    fks = [
+        fk["name"]
+        for fk in inspector.get_foreign_keys("transaction")
+        if fk["name"] and dropped & set(fk["constrained_columns"])
+    ]
+    with op.batch_alter_table("transaction") as batch_op:
+        for index_name in indexes:
+            batch_op.drop_index(index_name)
+        for fk_name in fks:
+            batch_op.drop_constraint(fk_name, type_="foreignkey")
+        for name in drop_columns:
+            batch_op.drop_column(name)
@@ -1,7 +1,7 @@
 """Add feature control tables
 
 Revision ID: c4d5e6f7a8b9
-Revises: 182e5471b900, 3162e83e485f, d37bc4322900
+Revises: b7f343be3e45
 Create Date: 2025-01-15 10:00:00.000000
 
 """
@@ -10,35 +10,72 @@ from collections.abc import Sequence
 
 import sqlalchemy as sa
 from alembic import op
-from sqlalchemy.dialects import sqlite
+from sqlalchemy.dialects import postgresql, sqlite
 
 # revision identifiers, used by Alembic.
 revision: str = "c4d5e6f7a8b9"
-down_revision: str | Sequence[str] | None = ("182e5471b900", "3162e83e485f", "d37bc4322900")
+down_revision: str | Sequence[str] | None = "b7f343be3e45"
 branch_labels: str | Sequence[str] | None = None
 depends_on: str | Sequence[str] | None = None
 
+# JSON columns are stored as JSONB on PostgreSQL: parsed once on write, compact and indexable
+JSON_TYPE = sa.JSON().with_variant(postgresql.JSONB(), "postgresql")
+
 
 def upgrade() -> None:
     conn = op.get_bind()
     inspector = sa.inspect(conn)
-    existing_tables = inspector.get_table_names()
+
+    # Index names of the feature control tables that already exist, reflected in a single pass, so
+    # safe_create_indexes consults this snapshot instead of querying the catalog on every call.
+    # Reflection is filtered by name, so the rest of the schema is never enumerated; tables missing
+    # from the result don't exist yet.
+    feature_tables = [
+        "feature_registry",
+        "license_tier_features",
+        "model_registry",
+        "component_registry",
+        "integration_registry",
+        "tenant_integration_configs",
+        "feature_audit_log",
+    ]
+    index_cache: dict[str, set[str]] = {
+        table: {idx["name"] for idx in indexes}
+        for (_, table), indexes in inspector.get_multi_indexes(filter_names=feature_tables).items()
+    }
+    existing_tables: set[str] = set(index_cache)
 
     # Helper functions
     def safe_create_table(table_name, *args, **kwargs):
-        if table_name not in existing_tables:
-            try:
-                op.create_table(table_name, *args, **kwargs)
-            except Exception:
-                pass
+        if table_name in existing_tables:
+            return
+        # IF NOT EXISTS lets the database skip a table created since the snapshot was taken
+        op.create_table(table_name, *args, if_not_exists=True, **kwargs)
+        # Keep the snapshot current, so later checks see the new table
+        existing_tables.add(table_name)
+        index_cache[table_name] = set()
 
-    def safe_create_index(index_name, table_name, columns, **kwargs):
-        try:
-            existing_indexes = [idx["name"] for idx in inspector.get_indexes(table_name)]
-            if index_name not in existing_indexes:
-                op.create_index(index_name, table_name, columns, **kwargs)
-        except Exception:
-            pass
+    # Helper function to create the missing indexes of a table. On PostgreSQL they are sent as one
+    # multi-statement string, so a table's indexes cost a single round-trip.
+    def safe_create_indexes(table_name, *indexes):
+        if table_name not in index_cache:
+            return  # Table doesn't exist
+        missing = [(name, columns, unique) for name, columns, unique in indexes if name not in index_cache[table_name]]
+        if not missing:
+            return
+        if conn.dialect.name == "postgresql":
+            quote = conn.dialect.identifier_preparer.quote
+            op.execute(
+                ";\n".join(
+                    f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {quote(name)} "
+                    f"ON {quote(table_name)} ({', '.join(quote(column) for column in columns)})"
+                    for name, columns, unique in missing
+                )
+            )
+        else:
+            for name, columns, unique in missing:
+                op.create_index(name, table_name, columns, unique=unique, if_not_exists=True)
+        index_cache[table_name].update(name for name, _, _ in missing)
 
     # ============================================
     # FEATURE REGISTRY (Source of Truth)
@@ -52,11 +89,11 @@ def upgrade() -> None:
         sa.Column("category", sa.String(50), nullable=False),
         sa.Column("subcategory", sa.String(50), nullable=True),
         sa.Column("feature_type", sa.String(20), nullable=False, server_default="boolean"),
-        sa.Column("default_value", sa.JSON(), nullable=False),
+        sa.Column("default_value", JSON_TYPE, nullable=False),
         sa.Column("is_premium", sa.Boolean(), nullable=False, server_default="0"),
         sa.Column("requires_setup", sa.Boolean(), nullable=False, server_default="0"),
-        sa.Column("depends_on", sa.JSON(), nullable=True),
-        sa.Column("conflicts_with", sa.JSON(), nullable=True),
+        sa.Column("depends_on", JSON_TYPE, nullable=True),
+        sa.Column("conflicts_with", JSON_TYPE, nullable=True),
         sa.Column("display_order", sa.Integer(), nullable=False, server_default="0"),
         sa.Column("icon", sa.String(50), nullable=True),
         sa.Column("help_url", sa.String(500), nullable=True),
@@ -65,13 +102,11 @@ def upgrade() -> None:
         sa.Column("deprecated_message", sa.Text(), nullable=True),
         sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
         sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        # UUID reference, not a FK: a FK to user would close the user ↔ license_tier cycle
         sa.Column("created_by", sa.String(), nullable=True),
         sa.PrimaryKeyConstraint("id"),
         sa.UniqueConstraint("feature_key"),
-        sa.ForeignKeyConstraint(["created_by"], ["user.id"]),
     )
-    safe_create_index("idx_feature_registry_category", "feature_registry", ["category"], unique=False)
-    safe_create_index("idx_feature_registry_key", "feature_registry", ["feature_key"], unique=True)
 
     # ============================================
     # LICENSE TIER FEATURES (What each tier includes)
@@ -81,17 +116,16 @@ def upgrade() -> None:
         sa.Column("id", sa.String(), nullable=False),
         sa.Column("license_tier_id", sa.String(), nullable=False),
         sa.Column("feature_key", sa.String(255), nullable=False),
-        sa.Column("feature_value", sa.JSON(), nullable=False),
+        sa.Column("feature_value", JSON_TYPE, nullable=False),
         sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
         sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        # UUID reference, not a FK: a FK to user would close the user ↔ license_tier cycle
         sa.Column("created_by", sa.String(), nullable=True),
         sa.PrimaryKeyConstraint("id"),
         sa.ForeignKeyConstraint(["license_tier_id"], ["license_tier.id"], ondelete="CASCADE"),
         sa.ForeignKeyConstraint(["feature_key"], ["feature_registry.feature_key"], ondelete="CASCADE"),
-        sa.ForeignKeyConstraint(["created_by"], ["user.id"]),
         sa.UniqueConstraint("license_tier_id", "feature_key"),
     )
-    safe_create_index("idx_tier_features_tier", "license_tier_features", ["license_tier_id"], unique=False)
 
     # ============================================
     # MODEL REGISTRY (Available Models)
@@ -119,8 +153,6 @@ def upgrade() -> None:
         sa.PrimaryKeyConstraint("id"),
         sa.UniqueConstraint("provider", "model_id"),
     )
-    safe_create_index("idx_model_registry_provider", "model_registry", ["provider"], unique=False)
-    safe_create_index("idx_model_registry_feature", "model_registry", ["feature_key"], unique=False)
 
     # ============================================
     # COMPONENT REGISTRY (Available Components)
@@ -135,7 +167,7 @@ def upgrade() -> None:
         sa.Column("category", sa.String(50), nullable=False),
         sa.Column("subcategory", sa.String(50), nullable=True),
         sa.Column("feature_key", sa.String(255), nullable=True),
-        sa.Column("required_features", sa.JSON(), nullable=True),
+        sa.Column("required_features", JSON_TYPE, nullable=True),
         sa.Column("icon", sa.String(50), nullable=True),
         sa.Column("documentation_url", sa.String(500), nullable=True),
         sa.Column("is_beta", sa.Boolean(), nullable=False, server_default="0"),
@@ -145,8 +177,6 @@ def upgrade() -> None:
         sa.PrimaryKeyConstraint("id"),
         sa.UniqueConstraint("component_key"),
     )
-    safe_create_index("idx_component_registry_category", "component_registry", ["category"], unique=False)
-    safe_create_index("idx_component_registry_feature", "component_registry", ["feature_key"], unique=False)
 
     # ============================================
     # INTEGRATION REGISTRY
@@ -159,8 +189,8 @@ def upgrade() -> None:
         sa.Column("description", sa.Text(), nullable=True),
         sa.Column("category", sa.String(50), nullable=False),
         sa.Column("feature_key", sa.String(255), nullable=False),
-        sa.Column("config_schema", sa.JSON(), nullable=True),
-        sa.Column("required_features", sa.JSON(), nullable=True),
+        sa.Column("config_schema", JSON_TYPE, nullable=True),
+        sa.Column("required_features", JSON_TYPE, nullable=True),
         sa.Column("icon", sa.String(50), nullable=True),
         sa.Column("documentation_url", sa.String(500), nullable=True),
         sa.Column("setup_guide_url", sa.String(500), nullable=True),
@@ -180,18 +210,18 @@ def upgrade() -> None:
         sa.Column("id", sa.String(), nullable=False),
         sa.Column("tenant_id", sa.String(), nullable=False),
         sa.Column("integration_key", sa.String(100), nullable=False),
-        sa.Column("config", sa.JSON(), nullable=False),
+        sa.Column("config", JSON_TYPE, nullable=False),
         sa.Column("encrypted_config", sa.LargeBinary(), nullable=True),
         sa.Column("is_enabled", sa.Boolean(), nullable=False, server_default="0"),
         sa.Column("last_health_check", sa.DateTime(timezone=True), nullable=True),
         sa.Column("health_status", sa.String(20), nullable=True),
         sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
         sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        # UUID reference, not a FK: a FK to user would close the user ↔ license_tier cycle
         sa.Column("created_by", sa.String(), nullable=True),
         sa.PrimaryKeyConstraint("id"),
         sa.ForeignKeyConstraint(["tenant_id"], ["tenant.id"], ondelete="CASCADE"),
         sa.ForeignKeyConstraint(["integration_key"], ["integration_registry.integration_key"]),
-        sa.ForeignKeyConstraint(["created_by"], ["user.id"]),
         sa.UniqueConstraint("tenant_id", "integration_key"),
     )
 
@@ -205,18 +235,42 @@ def upgrade() -> None:
         sa.Column("entity_id", sa.String(), nullable=False),
         sa.Column("feature_key", sa.String(255), nullable=False),
         sa.Column("action", sa.String(20), nullable=False),
-        sa.Column("old_value", sa.JSON(), nullable=True),
-        sa.Column("new_value", sa.JSON(), nullable=True),
+        sa.Column("old_value", JSON_TYPE, nullable=True),
+        sa.Column("new_value", JSON_TYPE, nullable=True),
+        # UUID reference, not a FK: a FK to user would close the user ↔ license_tier cycle
         sa.Column("performed_by", sa.String(), nullable=True),
         sa.Column("performed_at", sa.DateTime(timezone=True), nullable=False),
         sa.Column("reason", sa.Text(), nullable=True),
         sa.Column("ip_address", sa.String(45), nullable=True),
         sa.Column("user_agent", sa.Text(), nullable=True),
         sa.PrimaryKeyConstraint("id"),
-        sa.ForeignKeyConstraint(["performed_by"], ["user.id"]),
     )
-    safe_create_index("idx_feature_audit_entity", "feature_audit_log", ["entity_type", "entity_id"], unique=False)
-    safe_create_index("idx_feature_audit_time", "feature_audit_log", ["performed_at"], unique=False)
+
+    # ============================================
+    # INDEXES
+    # ============================================
+    # Created once all tables exist, so the DDL runs grouped: tables first, then their indexes
+    safe_create_indexes(
+        "feature_registry",
+        ("idx_feature_registry_category", ["category"], False),
+        ("idx_feature_registry_key", ["feature_key"], True),
+    )
+    safe_create_indexes("license_tier_features", ("idx_tier_features_tier", ["license_tier_id"], False))
+    safe_create_indexes(
+        "model_registry",
+        ("idx_model_registry_provider", ["provider"], False),
+        ("idx_model_registry_feature", ["feature_key"], False),
+    )
+    safe_create_indexes(
+        "component_registry",
+        ("idx_component_registry_category", ["category"], False),
+        ("idx_component_registry_feature", ["feature_key"], False),
+    )
+    safe_create_indexes(
+        "feature_audit_log",
+        ("idx_feature_audit_entity", ["entity_type", "entity_id"], False),
+        ("idx_feature_audit_time", ["performed_at"], False),
+    )
 
 
 def downgrade() -> None:
@@ -16,6 +16,9 @@ from collections.abc import Sequence
 
 import sqlalchemy as sa
 from alembic import op
+from sqlalchemy.dialects import postgresql
+
+from kluisz.utils import migration
 
 # revision identifiers, used by Alembic.
 revision: str = "d8e9f0a1b2c3"
@@ -30,15 +33,55 @@ def upgrade() -> None:
     inspector = sa.inspect(conn)
     dialect_name = conn.dialect.name
 
+    # Index, foreign key and CHECK constraint names of the feature control tables, reflected in a
+    # single pass each, so the helpers below consult this snapshot instead of querying the catalog
+    # on every call. Reflection is filtered by name, so the rest of the schema is never enumerated.
+    # Tables that don't exist are left out, which makes the helpers skip them.
+    feature_tables = [
+        "license_tier",
+        "feature_registry",
+        "license_tier_features",
+        "model_registry",
+        "component_registry",
+        "integration_registry",
+        "tenant_integration_configs",
+        "feature_audit_log",
+    ]
+    # Indexes left INVALID by a failed concurrent build count as missing, so they are rebuilt
+    invalid_indexes = migration.invalid_indexes(conn)
+    index_cache: dict[str, set[str]] = {
+        table: {idx["name"] for idx in indexes if idx["name"] not in invalid_indexes}
+        for (_, table), indexes in inspector.get_multi_indexes(filter_names=feature_tables).items()
+    }
+    reflected_tables = sorted(index_cache)
+    reflected_fks: dict[str, list[dict]] = {}
+    check_cache: dict[str, set[str]] = {}
+    if reflected_tables:
+        reflected_fks = {
+            table: fks for (_, table), fks in inspector.get_multi_foreign_keys(filter_names=reflected_tables).items()
+        }
+        if dialect_name != "sqlite":
+            check_cache = {
+                table: {ck["name"] for ck in checks}
+                for (_, table), checks in inspector.get_multi_check_constraints(filter_names=reflected_tables).items()
+            }
+    fk_cache: dict[str, set[str]] = {table: {fk["name"] for fk in fks} for table, fks in reflected_fks.items()}
+
+    # Indexes queued on PostgreSQL, built concurrently in one pass at the end of the upgrade
+    pending_indexes: list[tuple[str, str, list[str], dict]] = []
+
     # Helper function to safely create index
     def safe_create_index(index_name: str, table_name: str, columns: list[str], **kwargs):
         """Safely create index if it doesn't exist."""
-        try:
-            existing_indexes = [idx["name"] for idx in inspector.get_indexes(table_name)]
-            if index_name not in existing_indexes:
-                op.create_index(index_name, table_name, columns, **kwargs)
-        except Exception:
-            pass  # Index might already exist or table might not exist
+        if table_name not in index_cache or index_name in index_cache[table_name]:
+            return
+        if dialect_name == "postgresql":
+            # Build it without blocking writes to the table, see the end of upgrade()
+            pending_indexes.append((index_name, table_name, columns, kwargs))
+            index_cache[table_name].add(index_name)
+            return
+        op.create_index(index_name, table_name, columns, if_not_exists=True, **kwargs)
+        index_cache[table_name].add(index_name)
 
     # Helper function to safely add constraint
     def safe_add_constraint(table_name: str, constraint_name: str, constraint_text: str):
@@ -50,74 +93,74 @@ def upgrade() -> None:
             # Validation will be enforced at application level
             return
         
-        try:
-            existing_constraints = [
-                c["name"] for c in inspector.get_check_constraints(table_name)
-            ]
-            if constraint_name not in existing_constraints:
-                # PostgreSQL supports ALTER TABLE ... ADD CONSTRAINT
-                op.execute(
-                    sa.text(
-                        f"ALTER TABLE {table_name} ADD CONSTRAINT {constraint_name} CHECK ({constraint_text})"
-                    )
-                )
-        except Exception as e:
-            # Constraint might already exist or table might not exist
-            print(f"Warning: Could not add constraint {constraint_name}: {e}")
-            pass
+        if table_name not in check_cache or constraint_name in check_cache[table_name]:
+            return
+        # PostgreSQL supports ALTER TABLE ... ADD CONSTRAINT
+        op.execute(
+            sa.text(
+                f"ALTER TABLE {table_name} ADD CONSTRAINT {constraint_name} CHECK ({constraint_text})"
+            )
+        )
+        check_cache[table_name].add(constraint_name)
+
+    # Foreign keys added NOT VALID on PostgreSQL, validated at the end of the upgrade
+    pending_validations: list[tuple[str, str]] = []
 
     # Helper function to safely add foreign key
     def safe_add_fk(table_name: str, fk_name: str, columns: list[str], ref_table: str, ref_columns: list[str], ondelete: str = "RESTRICT"):
         """Safely add foreign key constraint if it doesn't exist."""
-        try:
-            # Check if FK already exists by inspecting foreign keys
-            fks = inspector.get_foreign_keys(table_name)
-            existing_fk_names = [fk["name"] for fk in fks]
-            if fk_name not in existing_fk_names:
-                op.create_foreign_key(
-                    fk_name,
-                    table_name,
-                    ref_table,
-                    columns,
-                    ref_columns,
-                    ondelete=ondelete,
-                )
-        except Exception:
-            pass  # FK might already exist
+        # SQLite can't add a foreign key to an existing table without rebuilding it
+        # Validation will be enforced at application level
+        if dialect_name == "sqlite":
+            return
+
+        if table_name not in fk_cache or fk_name in fk_cache[table_name]:
+            return
+        # On PostgreSQL, NOT VALID skips scanning the existing rows under the ALTER TABLE lock
+        op.create_foreign_key(
+            fk_name,
+            table_name,
+            ref_table,
+            columns,
+            ref_columns,
+            ondelete=ondelete,
+            postgresql_not_valid=dialect_name == "postgresql",
+        )
+        fk_cache[table_name].add(fk_name)
+        if dialect_name == "postgresql":
+            pending_validations.append((table_name, fk_name))
 
     # ============================================
     # P0 FIXES - Critical (Fix Immediately)
     # ============================================
 
     # 0. Fix FK cycle: Remove FK constraints that cause circular dependencies
+    # c4d5e6f7a8b9 no longer creates them, so this only finds them on databases created before that
     # The cycle: user → license_tier (via license_tier_id) AND various tables → user (via created_by)
     # All created_by/performed_by fields are now UUID references, validated at application level
     
     # Tables with created_by/performed_by fields that reference user.id
-    fk_removal_tables = [
-        ("license_tier", "created_by"),
-        ("feature_registry", "created_by"),
-        ("license_tier_features", "created_by"),
-        ("tenant_integration_configs", "created_by"),
-        ("feature_audit_log", "performed_by"),
-    ]
+    fk_removal_tables = {
+        "license_tier": "created_by",
+        "feature_registry": "created_by",
+        "license_tier_features": "created_by",
+        "tenant_integration_configs": "created_by",
+        "feature_audit_log": "performed_by",
+    }
     
-    for table_name, column_name in fk_removal_tables:
-        try:
-            fks = inspector.get_foreign_keys(table_name)
-            for fk in fks:
-                if column_name in fk.get("constrained_columns", []):
-                    op.drop_constraint(fk["name"], table_name, type_="foreignkey")
-                    print(f"Dropped FK constraint {fk['name']} from {table_name}.{column_name} to break cycle")
-        except Exception:
-            pass  # FK might not exist or table might not exist
-
-    # 1. Add composite index: (license_tier_id, feature_key) on license_tier_features
-    safe_create_index(
-        "idx_tier_features_tier_key",
-        "license_tier_features",
-        ["license_tier_id", "feature_key"],
-    )
+    # The foreign keys were reflected above, so this is a single pass over the snapshot.
+    # SQLite can't drop a constraint without rebuilding the table, so the FKs stay there.
+    if dialect_name != "sqlite":
+        for table_name, column_name in fk_removal_tables.items():
+            for fk in reflected_fks.get(table_name, []):
+                if column_name not in fk.get("constrained_columns", []):
+                    continue
+                op.drop_constraint(fk["name"], table_name, type_="foreignkey")
+                fk_cache[table_name].discard(fk["name"])
+                print(f"Dropped FK constraint {fk['name']} from {table_name}.{column_name} to break cycle")
+
+    # 1. (license_tier_id, feature_key) on license_tier_features is already indexed by the table's
+    # unique constraint, so no separate composite index is created
 
     # 2. Add FK constraints: ModelRegistry.feature_key → FeatureRegistry.feature_key
     safe_add_fk(
@@ -130,32 +173,16 @@ def upgrade() -> None:
     )
 
     # 3. Add FK constraints: ComponentRegistry.feature_key → FeatureRegistry.feature_key
-    # Note: feature_key is nullable, so we need to handle NULLs
-    # SQLite doesn't support partial FKs, so we'll add it only if all rows have feature_key
-    try:
-        # Check if all component_registry rows have feature_key
-        result = conn.execute(
-            sa.text("SELECT COUNT(*) FROM component_registry WHERE feature_key IS NULL")
-        )
-        null_count = result.scalar()
-        
-        if null_count == 0:
-            # All rows have feature_key, safe to add FK
-            safe_add_fk(
-                "component_registry",
-                "fk_component_registry_feature",
-                ["feature_key"],
-                "feature_registry",
-                ["feature_key"],
-                ondelete="RESTRICT",
-            )
-        else:
-            # Some rows have NULL feature_key - we'll add index but not FK constraint
-            # The FK will be enforced at application level for non-NULL values
-            print(f"Warning: {null_count} component_registry rows have NULL feature_key. FK constraint skipped.")
-    except Exception:
-        # Table might not exist or error checking
-        pass
+    # Note: feature_key is nullable. A foreign key only checks non-NULL values, so rows without
+    # a feature_key don't prevent adding it and no scan for them is needed.
+    safe_add_fk(
+        "component_registry",
+        "fk_component_registry_feature",
+        ["feature_key"],
+        "feature_registry",
+        ["feature_key"],
+        ondelete="RESTRICT",
+    )
 
     # 4. Add FK constraints: IntegrationRegistry.feature_key → FeatureRegistry.feature_key
     safe_add_fk(
@@ -171,20 +198,25 @@ def upgrade() -> None:
     # P1 FIXES - High Priority
     # ============================================
 
-    # 5. Add index: (tenant_id, is_enabled) on tenant_integration_configs
-    # For SQLite, we'll create a regular index (partial indexes not supported)
+    # 5. Add partial index: tenant_id WHERE is_enabled on tenant_integration_configs
+    # Only enabled configs are looked up by tenant, so disabled rows are left out of the index
+    # (PostgreSQL and SQLite 3.8+ both support partial indexes)
     safe_create_index(
         "idx_tenant_integration_active",
         "tenant_integration_configs",
-        ["tenant_id", "is_enabled"],
+        ["tenant_id"],
+        postgresql_where=sa.text("is_enabled = true"),
+        sqlite_where=sa.text("is_enabled = 1"),
     )
 
     # 6. Add index: (feature_key, performed_at DESC) on feature_audit_log
+    # On PostgreSQL it also covers the columns audit timelines return, allowing index-only scans
     safe_create_index(
         "idx_feature_audit_key_time",
         "feature_audit_log",
         ["feature_key", "performed_at"],
         postgresql_ops={"performed_at": "DESC"},
+        postgresql_include=["action", "entity_type", "entity_id", "performed_by"],
     )
 
     # 7. Add CHECK constraint on health_status
@@ -197,62 +229,109 @@ def upgrade() -> None:
         "health_status IN ('healthy', 'degraded', 'unhealthy') OR health_status IS NULL",
     )
 
-    # 8. Add index on feature_key for ComponentRegistry (if nullable, still useful for filtering)
+    # 8. Add index on feature_key for IntegrationRegistry (if not already exists)
     safe_create_index(
-        "idx_component_registry_feature",
-        "component_registry",
+        "idx_integration_registry_feature",
+        "integration_registry",
         ["feature_key"],
     )
 
-    # 9. Add index on feature_key for IntegrationRegistry (if not already exists)
+    # 9. Index FK columns that don't lead an existing index, so deleting or re-keying a parent row
+    # doesn't scan the child table (license_tier_features.feature_key cascades from feature_registry)
     safe_create_index(
-        "idx_integration_registry_feature",
-        "integration_registry",
+        "idx_tier_features_feature_key",
+        "license_tier_features",
         ["feature_key"],
     )
+    safe_create_index(
+        "idx_tenant_integration_integration_key",
+        "tenant_integration_configs",
+        ["integration_key"],
+    )
+
+    # 10. Add GIN index on feature_registry.depends_on for dependency lookups (PostgreSQL only)
+    # GIN needs JSONB; databases whose feature tables predate JSONB storage keep JSON and are skipped
+    if dialect_name == "postgresql" and "feature_registry" in index_cache:
+        depends_on_type = next(
+            (col["type"] for col in inspector.get_columns("feature_registry") if col["name"] == "depends_on"), None
+        )
+        if isinstance(depends_on_type, postgresql.JSONB):
+            safe_create_index(
+                "idx_feature_registry_depends_on_gin",
+                "feature_registry",
+                ["depends_on"],
+                postgresql_using="gin",
+            )
+
+    # 11. Build the queued indexes concurrently and validate the NOT VALID foreign keys. Neither
+    # CREATE INDEX CONCURRENTLY nor a non-blocking VALIDATE CONSTRAINT can run inside the migration
+    # transaction, so they share a single autocommit block, which keeps the migration lock.
+    if pending_indexes or pending_validations:
+        with migration.autocommit_block():
+            for index_name, table_name, columns, kwargs in pending_indexes:
+                migration.create_index_concurrently(index_name, table_name, columns, **kwargs)
+            for table_name, fk_name in pending_validations:
+                op.execute(sa.text(f"ALTER TABLE {table_name} VALIDATE CONSTRAINT {fk_name}"))
 
 
 def downgrade() -> None:
     """Remove indexes, foreign keys, and constraints."""
     conn = op.get_bind()
     inspector = sa.inspect(conn)
+    dialect_name = conn.dialect.name
+
+    # Names of the objects this downgrade may drop, reflected once, so the helpers below only
+    # issue DDL for objects that exist. SQLite never got the foreign keys and CHECK constraint.
+    feature_tables = [
+        "feature_registry",
+        "license_tier_features",
+        "model_registry",
+        "component_registry",
+        "integration_registry",
+        "tenant_integration_configs",
+        "feature_audit_log",
+    ]
+    index_cache: dict[str, set[str]] = {
+        table: {idx["name"] for idx in indexes}
+        for (_, table), indexes in inspector.get_multi_indexes(filter_names=feature_tables).items()
+    }
+    reflected_tables = sorted(index_cache)
+    fk_cache: dict[str, set[str]] = {}
+    check_cache: dict[str, set[str]] = {}
+    if reflected_tables and dialect_name != "sqlite":
+        fk_cache = {
+            table: {fk["name"] for fk in fks}
+            for (_, table), fks in inspector.get_multi_foreign_keys(filter_names=reflected_tables).items()
+        }
+        check_cache = {
+            table: {ck["name"] for ck in checks}
+            for (_, table), checks in inspector.get_multi_check_constraints(filter_names=reflected_tables).items()
+        }
 
     # Helper to safely drop index
     def safe_drop_index(index_name: str, table_name: str):
-        try:
-            existing_indexes = [idx["name"] for idx in inspector.get_indexes(table_name)]
-            if index_name in existing_indexes:
-                op.drop_index(index_name, table_name=table_name)
-        except Exception:
-            pass
+        if index_name in index_cache.get(table_name, ()):
+            op.drop_index(index_name, table_name=table_name)
 
     # Helper to safely drop constraint
     def safe_drop_constraint(table_name: str, constraint_name: str):
-        try:
-            # Try Alembic method first
+        if constraint_name in check_cache.get(table_name, ()):
             op.drop_constraint(constraint_name, table_name, type_="check")
-        except Exception:
-            try:
-                # Fallback to raw SQL
-                op.execute(
-                    sa.text(f"ALTER TABLE {table_name} DROP CONSTRAINT {constraint_name}")
-                )
-            except Exception:
-                pass
 
     # Helper to safely drop FK
     def safe_drop_fk(table_name: str, fk_name: str):
-        try:
+        if fk_name in fk_cache.get(table_name, ()):
             op.drop_constraint(fk_name, table_name, type_="foreignkey")
-        except Exception:
-            pass
 
     # Drop indexes
+    # No longer created on upgrade, but databases upgraded by earlier versions of this migration have it
     safe_drop_index("idx_tier_features_tier_key", "license_tier_features")
     safe_drop_index("idx_tenant_integration_active", "tenant_integration_configs")
     safe_drop_index("idx_feature_audit_key_time", "feature_audit_log")
-    safe_drop_index("idx_component_registry_feature", "component_registry")
     safe_drop_index("idx_integration_registry_feature", "integration_registry")
+    safe_drop_index("idx_feature_registry_depends_on_gin", "feature_registry")
+    safe_drop_index("idx_tier_features_feature_key", "license_tier_features")
+    safe_drop_index("idx_tenant_integration_integration_key", "tenant_integration_configs")
 
     # Drop foreign keys
     safe_drop_fk("model_registry", "fk_model_registry_feature")
@@ -82,9 +82,29 @@ UI_FEATURES = [
     ("ui.store.enabled", "Component Store", "store", False, True, "Access to component store"),
 ]
 
+# default_value payloads, shared by every seeded row
+ENABLED_JSON = '{"enabled": true}'
+DISABLED_JSON = '{"enabled": false}'
+
+# Statements are built once and shared by every row
+SELECT_EXISTING_FEATURES = sa.text(
+    "SELECT feature_key FROM feature_registry WHERE feature_key IN :keys"
+).bindparams(sa.bindparam("keys", expanding=True))
+
+INSERT_FEATURE = sa.text("""
+    INSERT INTO feature_registry 
+    (id, feature_key, feature_name, description, category, subcategory, 
+     feature_type, default_value, is_premium, is_active, display_order, created_at, updated_at)
+    VALUES 
+    (:id, :feature_key, :feature_name, :description, :category, :subcategory,
+     :feature_type, :default_value, :is_premium, :is_active, :display_order, :created_at, :updated_at)
+""")
+
 
 def upgrade() -> None:
     """Seed bundle and UI features into the feature registry."""
+    # env.py runs all migrations inside one transaction, so the seed is committed
+    # (and flushed) once at the end; do not open another one here
     conn = op.get_bind()
     
     # Check if feature_registry table exists
@@ -93,84 +113,50 @@ def upgrade() -> None:
         print("feature_registry table does not exist, skipping seed")
         return
     
-    now = datetime.now(timezone.utc).isoformat()
-    display_order = 100  # Start at 100 to not conflict with existing features
+    features = [("integrations", feature) for feature in BUNDLE_FEATURES] + [("ui", feature) for feature in UI_FEATURES]
     
-    # Seed bundle features
-    for feature_key, feature_name, subcategory, enabled, is_premium, description in BUNDLE_FEATURES:
-        # Check if feature already exists
-        result = conn.execute(
-            sa.text("SELECT 1 FROM feature_registry WHERE feature_key = :key"),
-            {"key": feature_key}
+    # One round-trip to find the features that already exist instead of one per feature
+    existing = {
+        row[0]
+        for row in conn.execute(
+            SELECT_EXISTING_FEATURES,
+            {"keys": [feature[0] for _, feature in features]},
         )
-        if result.fetchone() is None:
-            default_value = '{"enabled": ' + str(enabled).lower() + '}'
-            conn.execute(
-                sa.text("""
-                    INSERT INTO feature_registry 
-                    (id, feature_key, feature_name, description, category, subcategory, 
-                     feature_type, default_value, is_premium, is_active, display_order, created_at, updated_at)
-                    VALUES 
-                    (:id, :feature_key, :feature_name, :description, :category, :subcategory,
-                     :feature_type, :default_value, :is_premium, :is_active, :display_order, :created_at, :updated_at)
-                """),
-                {
-                    "id": str(uuid4()),
-                    "feature_key": feature_key,
-                    "feature_name": feature_name,
-                    "description": description,
-                    "category": "integrations",
-                    "subcategory": subcategory,
-                    "feature_type": "boolean",
-                    "default_value": default_value,
-                    "is_premium": is_premium,
-                    "is_active": True,
-                    "display_order": display_order,
-                    "created_at": now,
-                    "updated_at": now,
-                }
-            )
-            print(f"Seeded feature: {feature_key}")
-            display_order += 1
+    }
     
-    # Seed UI features
-    for feature_key, feature_name, subcategory, enabled, is_premium, description in UI_FEATURES:
-        # Check if feature already exists
-        result = conn.execute(
-            sa.text("SELECT 1 FROM feature_registry WHERE feature_key = :key"),
-            {"key": feature_key}
+    now = datetime.now(timezone.utc).isoformat()
+    display_order = 100  # Start at 100 to not conflict with existing features
+    rows = []
+    for category, (feature_key, feature_name, subcategory, enabled, is_premium, description) in features:
+        if feature_key in existing:
+            continue
+        rows.append(
+            {
+                "id": str(uuid4()),
+                "feature_key": feature_key,
+                "feature_name": feature_name,
+                "description": description,
+                "category": category,
+                "subcategory": subcategory,
+                "feature_type": "boolean",
+                "default_value": ENABLED_JSON if enabled else DISABLED_JSON,
+                "is_premium": is_premium,
+                "is_active": True,
+                "display_order": display_order,
+                "created_at": now,
+                "updated_at": now,
+            }
         )
-        if result.fetchone() is None:
-            default_value = '{"enabled": ' + str(enabled).lower() + '}'
-            conn.execute(
-                sa.text("""
-                    INSERT INTO feature_registry 
-                    (id, feature_key, feature_name, description, category, subcategory, 
-                     feature_type, default_value, is_premium, is_active, display_order, created_at, updated_at)
-                    VALUES 
-                    (:id, :feature_key, :feature_name, :description, :category, :subcategory,
-                     :feature_type, :default_value, :is_premium, :is_active, :display_order, :created_at, :updated_at)
-                """),
-                {
-                    "id": str(uuid4()),
-                    "feature_key": feature_key,
-                    "feature_name": feature_name,
-                    "description": description,
-                    "category": "ui",
-                    "subcategory": subcategory,
-                    "feature_type": "boolean",
-                    "default_value": default_value,
-                    "is_premium": is_premium,
-                    "is_active": True,
-                    "display_order": display_order,
-                    "created_at": now,
-                    "updated_at": now,
-                }
-            )
-            print(f"Seeded feature: {feature_key}")
-            display_order += 1
+        display_order += 1
+    
+    if not rows:
+        print("Bundle and UI features already present in feature_registry")
+        return
+    
+    # A single executemany; SQLAlchemy batches it into multi-VALUES INSERTs where the driver allows
+    conn.execute(INSERT_FEATURE, rows)
     
-    print(f"✅ Seeded bundle and UI features into feature_registry")
+    print(f"✅ Seeded {len(rows)} bundle and UI features into feature_registry")
 
 
 def downgrade() -> None:
@@ -34,15 +34,10 @@ def upgrade() -> None:
         'integrations.bundles.langwatch'
     ]
     
-    for key in observability_keys:
-        conn.execute(
-            sa.text("DELETE FROM feature_registry WHERE feature_key = :key"),
-            {"key": key}
-        )
-        conn.execute(
-            sa.text("DELETE FROM license_tier_features WHERE feature_key = :key"),
-            {"key": key}
-        )
+    # One DELETE per table; an expanding IN works on every dialect, unlike = ANY(:keys)
+    for table_name in ("feature_registry", "license_tier_features"):
+        table = sa.table(table_name, sa.column("feature_key"))
+        conn.execute(table.delete().where(table.c.feature_key.in_(observability_keys)))
 
 
 def downgrade() -> None:
@@ -3,6 +3,7 @@
 from kluisz.api.middleware.route_features import (
     ROUTE_FEATURE_MAP,
     EXEMPT_ROUTES,
+    classify_route,
     get_required_features,
     is_route_exempt,
 )
@@ -11,6 +12,7 @@ from kluisz.api.middleware.feature_middleware import FeatureEnforcementMiddlewar
 __all__ = [
     "ROUTE_FEATURE_MAP",
     "EXEMPT_ROUTES",
+    "classify_route",
     "get_required_features",
     "is_route_exempt",
     "FeatureEnforcementMiddleware",
@@ -15,8 +15,9 @@ from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 from klx.log.logger import logger
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp
 
-from kluisz.api.middleware.route_features import get_required_features, is_route_exempt
+from kluisz.api.middleware.route_features import classify_route
 from kluisz.services.features.control_service import FeatureControlService
 
 
@@ -37,18 +38,22 @@ class FeatureEnforcementMiddleware(BaseHTTPMiddleware):
         app.add_middleware(FeatureEnforcementMiddleware)
     """
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        path = request.url.path
+    def __init__(self, app: ASGIApp) -> None:
+        super().__init__(app)
+        # The service holds no per-request state, so one instance serves every request
+        self._service = FeatureControlService()
 
-        # Skip exempt routes
-        if is_route_exempt(path):
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        # CORS preflights never reach a feature-gated handler. HEAD is not skipped:
+        # it runs the GET handler.
+        if request.method == "OPTIONS":
             return await call_next(request)
 
-        # Get required features for this route
-        required_features = get_required_features(path)
+        # Classify the route once: exempt routes and routes without
+        # specific requirements are allowed through
+        is_exempt, required_features = classify_route(request.url.path)
 
-        if not required_features:
-            # No specific requirements, allow
+        if is_exempt or not required_features:
             return await call_next(request)
 
         # Get current user from request state
@@ -64,27 +69,19 @@ class FeatureEnforcementMiddleware(BaseHTTPMiddleware):
         if getattr(user, "is_platform_superadmin", False):
             return await call_next(request)
 
+        user_id = str(getattr(user, "id", user))
+
         # Check features (OR logic - any enabled feature allows access)
         try:
-            service = FeatureControlService()
-            user_id = str(user.id) if hasattr(user, "id") else str(user)
-
-            for feature_key in required_features:
-                try:
-                    if await service.is_feature_enabled(user_id, feature_key):
-                        # At least one required feature is enabled
-                        return await call_next(request)
-                except Exception as e:
-                    # Log but don't fail on feature check errors
-                    await logger.awarning(
-                        f"Feature check error for {feature_key}: {e}"
-                    )
-                    continue
-
+            # One resolution of the user's features covers every required key
+            enabled = await self._service.is_any_feature_enabled(user_id, required_features)
         except Exception as e:
-            # If feature service fails, log and allow (fail-open for service errors)
-            # This prevents total lockout if the feature service is down
-            await logger.aerror(f"Feature middleware error: {e}")
+            # Log but don't fail on feature check errors
+            await logger.awarning(f"Feature check error for {', '.join(required_features)}: {e}")
+            enabled = False
+
+        if enabled:
+            # At least one required feature is enabled
             return await call_next(request)
 
         # No required features are enabled - deny access
@@ -108,15 +105,18 @@ class FeatureEnforcementMiddlewareStrict(BaseHTTPMiddleware):
     Use this in high-security environments where feature bypass is unacceptable.
     """
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        path = request.url.path
+    def __init__(self, app: ASGIApp) -> None:
+        super().__init__(app)
+        # The service holds no per-request state, so one instance serves every request
+        self._service = FeatureControlService()
 
-        if is_route_exempt(path):
+    async def dispatch(self, request: Request, call_next: Callable) -> Response:
+        if request.method == "OPTIONS":
             return await call_next(request)
 
-        required_features = get_required_features(path)
+        is_exempt, required_features = classify_route(request.url.path)
 
-        if not required_features:
+        if is_exempt or not required_features:
             return await call_next(request)
 
         user = getattr(request.state, "user", None)
@@ -129,13 +129,8 @@ class FeatureEnforcementMiddlewareStrict(BaseHTTPMiddleware):
 
         # Strict mode: fail-closed on ANY error
         try:
-            service = FeatureControlService()
-            user_id = str(user.id) if hasattr(user, "id") else str(user)
-
-            for feature_key in required_features:
-                if await service.is_feature_enabled(user_id, feature_key):
-                    return await call_next(request)
-
+            user_id = str(getattr(user, "id", user))
+            enabled = await self._service.is_any_feature_enabled(user_id, required_features)
         except Exception as e:
             # Fail-closed: deny on error
             await logger.aerror(f"Feature middleware error (strict mode): {e}")
@@ -147,6 +142,9 @@ class FeatureEnforcementMiddlewareStrict(BaseHTTPMiddleware):
                 },
             )
 
+        if enabled:
+            return await call_next(request)
+
         return JSONResponse(
             status_code=403,
             content={
@@ -9,6 +9,7 @@ No endpoint code changes needed.
 """
 
 import re
+from functools import lru_cache
 from typing import Dict, List
 
 
@@ -174,10 +175,132 @@ EXEMPT_ROUTES: List[str] = [
 ]
 
 
+# =============================================================================
+# COMPILED PATTERNS
+# =============================================================================
+
+# Each pattern set is compiled once into a single alternation so a request path
+# is classified in one regex scan; keep them in sync with ROUTE_FEATURE_MAP /
+# EXEMPT_ROUTES through the helpers below.
+_NEVER_MATCH: re.Pattern[str] = re.compile(r"(?!)")
+
+
+class _CompiledRoutes:
+    """Compiled forms of EXEMPT_ROUTES and ROUTE_FEATURE_MAP, updated in place on recompile."""
+
+    def __init__(self) -> None:
+        self.exempt_union: re.Pattern[str] = _NEVER_MATCH
+        # Exempt patterns that are plain literals ("^/health.*", "^/docs$"), checked with
+        # str.startswith / set membership before any regex work
+        self.exempt_prefixes: tuple[str, ...] = ()
+        self.exempt_exact: frozenset[str] = frozenset()
+        # (alternation, group name -> features), swapped as one object on recompile
+        self.route_matcher: tuple[re.Pattern[str], dict[str, list[str]]] = (_NEVER_MATCH, {})
+
+
+_COMPILED = _CompiledRoutes()
+
+
+def _union(patterns: list[str]) -> re.Pattern[str]:
+    """Compile patterns into one case-insensitive alternation, tried in order."""
+    if not patterns:
+        return _NEVER_MATCH
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), re.IGNORECASE)
+
+
+# UUID / hex id path segments, collapsed so /flows/<id>/export shares one cache entry
+_ID_SEGMENT = re.compile(r"/[0-9a-f-]{8,}(?=/|$)", re.IGNORECASE)
+
+
+def _normalize_path(path: str) -> str:
+    """Replace id-like path segments with ``:id`` for use as a cache key."""
+    return _ID_SEGMENT.sub("/:id", path)
+
+
+def _is_static_exempt(path: str) -> bool:
+    """Case-sensitive fast path for literal exempt routes; misses fall back to the regex."""
+    return path.startswith(_COMPILED.exempt_prefixes) or path in _COMPILED.exempt_exact
+
+
+@lru_cache(maxsize=4096)
+def _classify_path(path: str) -> tuple[bool, list[str]]:
+    """Return ``(is_exempt, required_features)`` for a normalized path."""
+    if _COMPILED.exempt_union.match(path):
+        return True, []
+
+    route_union, group_features = _COMPILED.route_matcher
+    match = route_union.match(path)
+    if match:
+        return False, group_features[match.lastgroup]
+
+    return False, []  # No specific requirements
+
+
+# No unescaped metacharacters; only punctuation may be escaped (\d, \w, ... are classes)
+_LITERAL_REGEX = re.compile(r"(?:[^\\.^$*+?{}\[\]|()]|\\[^A-Za-z0-9])*")
+
+
+def _literal(pattern: str) -> str | None:
+    """Return the literal text of a regex without metacharacters, else None."""
+    if not _LITERAL_REGEX.fullmatch(pattern):
+        return None
+    return re.sub(r"\\(.)", r"\1", pattern)
+
+
+def _compile_exempt_routes() -> None:
+    """Recompile the exempt route patterns."""
+    prefixes = []
+    exact = set()
+    for pattern in EXEMPT_ROUTES:
+        if not pattern.startswith("^"):
+            continue
+        if pattern.endswith(".*") and (literal := _literal(pattern[1:-2])):
+            prefixes.append(literal)
+        elif pattern.endswith("$") and (literal := _literal(pattern[1:-1])):
+            exact.add(literal)
+    _COMPILED.exempt_union = _union(EXEMPT_ROUTES)
+    _COMPILED.exempt_prefixes = tuple(prefixes)
+    _COMPILED.exempt_exact = frozenset(exact)
+    _classify_path.cache_clear()
+
+
+def _compile_route_map() -> None:
+    """Recompile the protected route patterns, preserving their priority order.
+
+    Each pattern is wrapped in a named group; the outermost group closes last,
+    so ``match.lastgroup`` names the pattern that matched.
+    """
+    _COMPILED.route_matcher = (
+        _union([f"(?P<_route{i}>{pattern})" for i, pattern in enumerate(ROUTE_FEATURE_MAP)]),
+        {f"_route{i}": features for i, features in enumerate(ROUTE_FEATURE_MAP.values())},
+    )
+    _classify_path.cache_clear()
+
+
+_compile_exempt_routes()
+_compile_route_map()
+
+
 # =============================================================================
 # UTILITY FUNCTIONS
 # =============================================================================
 
+def classify_route(path: str) -> tuple[bool, list[str]]:
+    """
+    Classify a route path in a single pass.
+    
+    Args:
+        path: The request path (e.g., "/api/v2/mcp/servers")
+    
+    Returns:
+        Tuple of (is_exempt, required_features). Exempt routes have no
+        required features; an empty list means no specific requirements.
+    """
+    if _is_static_exempt(path):
+        return True, []
+    return _classify_path(_normalize_path(path))
+
+
 def get_required_features(path: str) -> List[str]:
     """
     Get required features for a route path.
@@ -189,17 +312,7 @@ def get_required_features(path: str) -> List[str]:
         List of feature keys required (OR logic - any enables access).
         Empty list means no specific feature requirements.
     """
-    # Check exemptions first
-    for pattern in EXEMPT_ROUTES:
-        if re.match(pattern, path, re.IGNORECASE):
-            return []
-    
-    # Find matching feature requirements
-    for pattern, features in ROUTE_FEATURE_MAP.items():
-        if re.match(pattern, path, re.IGNORECASE):
-            return features
-    
-    return []  # No specific requirements
+    return classify_route(path)[1]
 
 
 def is_route_exempt(path: str) -> bool:
@@ -212,7 +325,7 @@ def is_route_exempt(path: str) -> bool:
     Returns:
         True if the route should bypass feature enforcement
     """
-    return any(re.match(pattern, path, re.IGNORECASE) for pattern in EXEMPT_ROUTES)
+    return classify_route(path)[0]
 
 
 def get_all_protected_routes() -> Dict[str, List[str]]:
@@ -247,6 +360,7 @@ def add_route_protection(pattern: str, features: List[str]) -> None:
         features: List of required features (OR logic)
     """
     ROUTE_FEATURE_MAP[pattern] = features
+    _compile_route_map()
 
 
 def remove_route_protection(pattern: str) -> bool:
@@ -262,6 +376,7 @@ def remove_route_protection(pattern: str) -> bool:
     """
     if pattern in ROUTE_FEATURE_MAP:
         del ROUTE_FEATURE_MAP[pattern]
+        _compile_route_map()
         return True
     return False
 
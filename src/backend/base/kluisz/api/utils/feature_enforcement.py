@@ -1,12 +1,12 @@
 """Feature enforcement utilities for API endpoints."""
 
-from functools import wraps
+from functools import lru_cache, wraps
 from typing import Callable
 
 from fastapi import Depends, HTTPException, status
 
 from kluisz.api.utils import CurrentActiveUser
-from kluisz.services.features.control_service import FeatureControlService
+from kluisz.services.features.control_service import get_feature_service
 
 
 class FeatureNotEnabled(HTTPException):
@@ -43,7 +43,7 @@ async def check_feature_enabled(
     if allow_superadmin and user.is_platform_superadmin:
         return True
 
-    service = FeatureControlService()
+    service = get_feature_service()
     is_enabled = await service.is_feature_enabled(str(user.id), feature_key)
 
     if not is_enabled:
@@ -52,6 +52,9 @@ async def check_feature_enabled(
     return True
 
 
+# The guard factories are cached so that the same guard used on a router and a route is
+# one dependency object, which FastAPI then resolves only once per request.
+@lru_cache(maxsize=512)
 def require_feature(
     feature_key: str,
     *,
@@ -83,7 +86,7 @@ def require_feature(
         if allow_superadmin and user.is_platform_superadmin:
             return True
 
-        service = FeatureControlService()
+        service = get_feature_service()
         is_enabled = await service.is_feature_enabled(str(user.id), feature_key)
 
         if not is_enabled:
@@ -94,6 +97,7 @@ def require_feature(
     return dependency
 
 
+@lru_cache(maxsize=512)
 def require_any_feature(
     *feature_keys: str,
     allow_superadmin: bool = True,
@@ -124,12 +128,11 @@ def require_any_feature(
         if allow_superadmin and user.is_platform_superadmin:
             return True
 
-        service = FeatureControlService()
+        service = get_feature_service()
+        results = await service.are_features_enabled(str(user.id), feature_keys)
 
-        for feature_key in feature_keys:
-            is_enabled = await service.is_feature_enabled(str(user.id), feature_key)
-            if is_enabled:
-                return True
+        if any(results.values()):
+            return True
 
         raise FeatureNotEnabled(
             ", ".join(feature_keys),
@@ -139,6 +142,7 @@ def require_any_feature(
     return dependency
 
 
+@lru_cache(maxsize=512)
 def require_all_features(
     *feature_keys: str,
     allow_superadmin: bool = True,
@@ -169,13 +173,9 @@ def require_all_features(
         if allow_superadmin and user.is_platform_superadmin:
             return True
 
-        service = FeatureControlService()
-        missing_features = []
-
-        for feature_key in feature_keys:
-            is_enabled = await service.is_feature_enabled(str(user.id), feature_key)
-            if not is_enabled:
-                missing_features.append(feature_key)
+        service = get_feature_service()
+        results = await service.are_features_enabled(str(user.id), feature_keys)
+        missing_features = [feature_key for feature_key, is_enabled in results.items() if not is_enabled]
 
         if missing_features:
             raise FeatureNotEnabled(
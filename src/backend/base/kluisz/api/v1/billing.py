@@ -7,7 +7,6 @@ by the metering callback during flow execution.
 from datetime import date, datetime, timedelta, timezone
 from typing import Annotated
 from uuid import UUID
-from decimal import Decimal
 
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import select, func, and_
@@ -36,54 +35,91 @@ def _default_end_date() -> date:
     return date.today()
 
 
-async def _get_transaction_summary(
-    session,
-    user_ids: list[UUID] | None = None,
-    start_date: date | None = None,
-    end_date: date | None = None,
-) -> dict:
-    """Get transaction summary from local DB (fast!)"""
+def _summary_conditions(start_date: date | None, end_date: date | None) -> list:
+    """Filter deductions to the requested date range."""
     conditions = [TransactionTable.transaction_type == "deduction"]
-    
-    if user_ids:
-        conditions.append(TransactionTable.user_id.in_(user_ids))
-    
+
     if start_date:
         start_dt = datetime.combine(start_date, datetime.min.time(), tzinfo=timezone.utc)
         conditions.append(TransactionTable.timestamp >= start_dt)
-    
+
     if end_date:
         end_dt = datetime.combine(end_date, datetime.max.time(), tzinfo=timezone.utc)
         conditions.append(TransactionTable.timestamp <= end_dt)
-    
-    stmt = select(TransactionTable).where(and_(*conditions))
-    result = await session.exec(stmt)
-    transactions = list(result.all())
-    
-    total_credits = 0
-    total_tokens = 0
-    total_cost = Decimal("0.00")
-    active_users = set()
-    
-    for tx in transactions:
-        total_credits += tx.credits_amount or 0
-        metadata = tx.transaction_metadata or {}
-        total_tokens += metadata.get("total_tokens", 0) or 0
-        total_cost += Decimal(str(metadata.get("cost_usd", 0) or 0))
-        if tx.user_id:
-            active_users.add(str(tx.user_id))
-    
+
+    return conditions
+
+
+def _summary_columns() -> tuple:
+    """Aggregate columns read back by _summary_from_row."""
+    metadata = TransactionTable.transaction_metadata
+    return (
+        func.count(TransactionTable.id),
+        func.coalesce(func.sum(TransactionTable.credits_amount), 0),
+        func.coalesce(func.sum(metadata["total_tokens"].as_float()), 0),
+        func.coalesce(func.sum(metadata["cost_usd"].as_float()), 0),
+        func.count(func.distinct(TransactionTable.user_id)),
+    )
+
+
+def _summary_from_row(row, start_date: date | None, end_date: date | None) -> dict:
+    total_flow_runs, total_credits, total_tokens, total_cost, active_users_count = row
     return {
-        "total_flow_runs": len(transactions),
-        "total_credits_used": total_credits,
-        "total_tokens": total_tokens,
+        "total_flow_runs": total_flow_runs,
+        "total_credits_used": int(total_credits),
+        "total_tokens": int(total_tokens),
         "total_cost_usd": float(total_cost),
-        "active_users_count": len(active_users),
+        "active_users_count": active_users_count,
         "start_date": start_date.isoformat() if start_date else None,
         "end_date": end_date.isoformat() if end_date else None,
     }
 
 
+async def _get_transaction_summary(
+    session,
+    user_ids: list[UUID] | None = None,
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> dict:
+    """Get transaction summary from local DB (fast!)"""
+    conditions = _summary_conditions(start_date, end_date)
+
+    if user_ids:
+        conditions.append(TransactionTable.user_id.in_(user_ids))
+
+    # Aggregate in the database instead of loading every transaction row
+    stmt = select(*_summary_columns()).where(and_(*conditions))
+    result = await session.exec(stmt)
+    return _summary_from_row(result.one(), start_date, end_date)
+
+
+async def _get_tenant_usage_bulk(
+    session,
+    tenant_ids: list[UUID],
+    start_date: date | None = None,
+    end_date: date | None = None,
+) -> dict[str, dict]:
+    """Get a transaction summary per tenant with one grouped query.
+
+    Tenants without transactions get an all-zero summary.
+    """
+    summaries = {str(tenant_id): _summary_from_row((0, 0, 0, 0, 0), start_date, end_date) for tenant_id in tenant_ids}
+    if not tenant_ids:
+        return summaries
+
+    stmt = (
+        select(User.tenant_id, *_summary_columns())
+        .select_from(TransactionTable)
+        .join(User, User.id == TransactionTable.user_id)
+        .where(and_(*_summary_conditions(start_date, end_date), User.tenant_id.in_(tenant_ids)))
+        .group_by(User.tenant_id)
+    )
+    result = await session.exec(stmt)
+    for tenant_id, *row in result.all():
+        summaries[str(tenant_id)] = _summary_from_row(row, start_date, end_date)
+    return summaries
+
+
 @router.get("/tenant/{tenant_id}/usage")
 async def get_tenant_usage(
     tenant_id: UUID,
@@ -105,13 +141,8 @@ async def get_tenant_usage(
     if not tenant:
         raise HTTPException(status_code=404, detail="Tenant not found")
 
-    # Get all users for this tenant
-    user_stmt = select(User).where(User.tenant_id == tenant_id)
-    user_result = await session.exec(user_stmt)
-    users = list(user_result.all())
-    user_ids = [u.id for u in users]
-    
-    summary = await _get_transaction_summary(session, user_ids, start_date, end_date)
+    usage = await _get_tenant_usage_bulk(session, [tenant_id], start_date, end_date)
+    summary = usage[str(tenant_id)]
     
     return {
         "tenant_id": str(tenant_id),
@@ -141,13 +172,8 @@ async def get_tenant_usage_summary(
     if not tenant:
         raise HTTPException(status_code=404, detail="Tenant not found")
 
-    # Get all users for this tenant
-    user_stmt = select(User).where(User.tenant_id == tenant_id)
-    user_result = await session.exec(user_stmt)
-    users = list(user_result.all())
-    user_ids = [u.id for u in users]
-    
-    summary = await _get_transaction_summary(session, user_ids, start_date, end_date)
+    usage = await _get_tenant_usage_bulk(session, [tenant_id], start_date, end_date)
+    summary = usage[str(tenant_id)]
     summary["tenant_name"] = tenant.name
     
     # Add subscription/license info
@@ -254,6 +280,11 @@ async def get_analytics_overview(
             result = await session.execute(stmt)
             tiers_dict = {str(t.id): t for t in result.scalars().all()}
         
+        # Get usage for the last 30 days for all tenants in one query
+        start_date = date.today() - timedelta(days=30)
+        end_date = date.today()
+        usage = await _get_tenant_usage_bulk(session, [t.id for t in tenants], start_date, end_date)
+        
         tenant_data = []
         for tenant in tenants:
             user_count = user_counts.get(str(tenant.id), 0)
@@ -270,6 +301,7 @@ async def get_analytics_overview(
                     "subscription_status": tenant.subscription_status,
                     "license_count": tenant.subscription_license_count or 0,
                 } if tier else None,
+                "usage_summary": usage[str(tenant.id)],
             })
         
         return {
@@ -293,16 +325,11 @@ async def get_analytics_overview(
         if tenant.subscription_tier_id:
             tier = await session.get(LicenseTier, tenant.subscription_tier_id)
         
-        # Get all users for this tenant
-        user_stmt = select(User).where(User.tenant_id == tenant.id)
-        user_result = await session.exec(user_stmt)
-        users = list(user_result.all())
-        user_ids = [u.id for u in users]
-        
         # Get usage summary for last 30 days
         start_date = date.today() - timedelta(days=30)
         end_date = date.today()
-        usage_summary = await _get_transaction_summary(session, user_ids, start_date, end_date)
+        usage = await _get_tenant_usage_bulk(session, [tenant.id], start_date, end_date)
+        usage_summary = usage[str(tenant.id)]
 
         return {
             "role": "tenant_admin",
@@ -1,9 +1,11 @@
 """License management API endpoints."""
 
+from functools import lru_cache
 from typing import Annotated
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 
 from kluisz.services.auth.utils import get_current_active_superuser, get_current_active_user
 from kluisz.services.database.models.license.crud import (
@@ -179,26 +181,33 @@ async def delete_license_endpoint(
     await delete_license(session, license_id)
 
 
+@lru_cache(maxsize=1)
+def _tier_info_body() -> bytes:
+    """Serialize the static tier configurations once; they never change at runtime."""
+    from kluisz.services.database.models.license.tier_config import TIER_CONFIGS
+
+    return orjson.dumps(
+        {
+            "tiers": [
+                {
+                    "tier": tier.value,
+                    "max_users": config["max_users"],
+                    "max_flows": config["max_flows"],
+                    "max_api_calls": config["max_api_calls"],
+                    "credits": config["credits"],
+                    "credits_per_month": config["credits_per_month"],
+                    "price": str(config["price"]),
+                    "features": config["features"],
+                }
+                for tier, config in TIER_CONFIGS.items()
+            ]
+        }
+    )
+
+
 @router.get("/tiers/info")
 async def get_tier_info(
     current_user: CurrentUser,
-) -> dict:
+) -> Response:
     """Get information about available license tiers."""
-    from kluisz.services.database.models.license.tier_config import TIER_CONFIGS
-
-    return {
-        "tiers": [
-            {
-                "tier": tier.value,
-                "max_users": config["max_users"],
-                "max_flows": config["max_flows"],
-                "max_api_calls": config["max_api_calls"],
-                "credits": config["credits"],
-                "credits_per_month": config["credits_per_month"],
-                "price": str(config["price"]),
-                "features": config["features"],
-            }
-            for tier, config in TIER_CONFIGS.items()
-        ]
-    }
-
+    return Response(content=_tier_info_body(), media_type="application/json")
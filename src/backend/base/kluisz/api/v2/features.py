@@ -8,7 +8,7 @@ from pydantic import BaseModel
 from kluisz.api.utils import CurrentActiveUser
 from kluisz.services.auth.utils import get_current_active_superuser
 from kluisz.services.database.models.user.model import User
-from kluisz.services.features.control_service import FeatureControlService
+from kluisz.services.features.control_service import get_feature_service
 from kluisz.services.limits.enforcement import get_limits_enforcement_service
 
 # Type aliases for dependencies
@@ -62,7 +62,7 @@ async def get_my_features(
     current_user: CurrentUser,
 ) -> FeatureResponse:
     """Get all enabled features for current user."""
-    service = FeatureControlService()
+    service = get_feature_service()
     result = await service.get_user_features(str(current_user.id))
 
     return FeatureResponse(
@@ -79,7 +79,7 @@ async def check_feature(
     current_user: CurrentUser,
 ) -> FeatureCheckResponse:
     """Check if a specific feature is enabled for current user."""
-    service = FeatureControlService()
+    service = get_feature_service()
     result = await service.get_user_features(str(current_user.id))
 
     feature = result["features"].get(feature_key)
@@ -96,7 +96,7 @@ async def get_available_models(
     current_user: CurrentUser,
 ) -> list[EnabledModel]:
     """Get list of available models for current user."""
-    service = FeatureControlService()
+    service = get_feature_service()
     models = await service.get_enabled_models(str(current_user.id))
     return [EnabledModel(**m) for m in models]
 
@@ -106,7 +106,7 @@ async def get_available_components(
     current_user: CurrentUser,
 ) -> list[str]:
     """Get list of available component keys for current user."""
-    service = FeatureControlService()
+    service = get_feature_service()
     return await service.get_enabled_components(str(current_user.id))
 
 
@@ -176,7 +176,7 @@ async def set_tier_features(
     current_user: SuperAdmin,
 ) -> dict[str, Any]:
     """Set features for a license tier. Super Admin only."""
-    service = FeatureControlService()
+    service = get_feature_service()
     await service.set_tier_features(
         tier_id=tier_id,
         features=request.features,
@@ -191,7 +191,7 @@ async def get_tier_features(
     current_user: SuperAdmin,
 ) -> TierFeaturesResponse:
     """Get all features defined for a tier. Super Admin only."""
-    service = FeatureControlService()
+    service = get_feature_service()
     features = await service.get_tier_features(tier_id)
     return TierFeaturesResponse(tier_id=tier_id, features=features)
 
@@ -202,7 +202,7 @@ async def list_feature_registry(
     category: str | None = None,
 ) -> list[FeatureRegistryItem]:
     """List all features in the registry. Super Admin only."""
-    service = FeatureControlService()
+    service = get_feature_service()
     features = await service.get_feature_registry(category=category)
     return [FeatureRegistryItem(**f) for f in features]
 
@@ -6,10 +6,14 @@ from typing import Any, Optional
 from uuid import uuid4
 
 from sqlalchemy import JSON, Column, Numeric
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlmodel import Field, SQLModel
 
 from kluisz.schema.serialize import UUIDstr
 
+# JSON columns are stored as JSONB on PostgreSQL: parsed once on write, compact and indexable
+JSON_TYPE = JSON().with_variant(JSONB(), "postgresql")
+
 
 class FeatureRegistry(SQLModel, table=True):
     """Master registry of all available features."""
@@ -31,14 +35,14 @@ class FeatureRegistry(SQLModel, table=True):
     feature_type: str = Field(default="boolean", max_length=20)  # boolean, integer, string, json
     default_value: dict = Field(
         default_factory=lambda: {"enabled": False},
-        sa_column=Column(JSON),
+        sa_column=Column(JSON_TYPE),
     )
 
     # Metadata
     is_premium: bool = Field(default=False)
     requires_setup: bool = Field(default=False)
-    depends_on: list[str] = Field(default_factory=list, sa_column=Column(JSON))
-    conflicts_with: list[str] = Field(default_factory=list, sa_column=Column(JSON))
+    depends_on: list[str] = Field(default_factory=list, sa_column=Column(JSON_TYPE))
+    conflicts_with: list[str] = Field(default_factory=list, sa_column=Column(JSON_TYPE))
 
     # UI hints
     display_order: int = Field(default=0)
@@ -73,7 +77,7 @@ class LicenseTierFeatures(SQLModel, table=True):
     feature_key: str = Field(foreign_key="feature_registry.feature_key", max_length=255)
 
     # Feature value for this tier
-    feature_value: dict = Field(sa_column=Column(JSON))
+    feature_value: dict = Field(sa_column=Column(JSON_TYPE))
 
     # Audit
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -176,7 +180,7 @@ class ComponentRegistry(SQLModel, table=True):
     )
 
     # Requirements
-    required_features: list[str] = Field(default_factory=list, sa_column=Column(JSON))
+    required_features: list[str] = Field(default_factory=list, sa_column=Column(JSON_TYPE))
 
     # Metadata
     icon: Optional[str] = Field(default=None, nullable=True, max_length=50)
@@ -213,10 +217,10 @@ class IntegrationRegistry(SQLModel, table=True):
     )
 
     # Configuration schema
-    config_schema: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    config_schema: Optional[dict] = Field(default=None, sa_column=Column(JSON_TYPE))
 
     # Requirements
-    required_features: list[str] = Field(default_factory=list, sa_column=Column(JSON))
+    required_features: list[str] = Field(default_factory=list, sa_column=Column(JSON_TYPE))
 
     # Metadata
     icon: Optional[str] = Field(default=None, nullable=True, max_length=50)
@@ -243,7 +247,7 @@ class TenantIntegrationConfig(SQLModel, table=True):
     integration_key: str = Field(foreign_key="integration_registry.integration_key", max_length=100)
 
     # Configuration (encrypted sensitive fields)
-    config: dict = Field(default_factory=dict, sa_column=Column(JSON))
+    config: dict = Field(default_factory=dict, sa_column=Column(JSON_TYPE))
     encrypted_config: Optional[bytes] = Field(default=None, nullable=True)
 
     # Status
@@ -284,8 +288,8 @@ class FeatureAuditLog(SQLModel, table=True):
 
     # Change details
     action: str = Field(max_length=20)  # enable, disable, update, request
-    old_value: Optional[dict] = Field(default=None, sa_column=Column(JSON))
-    new_value: Optional[dict] = Field(default=None, sa_column=Column(JSON))
+    old_value: Optional[dict] = Field(default=None, sa_column=Column(JSON_TYPE))
+    new_value: Optional[dict] = Field(default=None, sa_column=Column(JSON_TYPE))
 
     # Who and when
     # Note: Not a FK constraint to avoid circular dependencies
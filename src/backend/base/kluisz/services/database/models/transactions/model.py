@@ -3,7 +3,7 @@ from typing import Any
 from uuid import UUID, uuid4
 
 from pydantic import field_serializer, field_validator
-from sqlmodel import JSON, Column, Field, SQLModel
+from sqlmodel import JSON, Column, Field, Index, SQLModel
 
 from kluisz.schema.serialize import UUIDstr
 from kluisz.serialization.serialization import get_max_items_length, get_max_text_length, serialize
@@ -126,6 +126,10 @@ class TransactionBase(SQLModel):
 
 class TransactionTable(TransactionBase, table=True):  # type: ignore[call-arg]
     __tablename__ = "transaction"
+    __table_args__ = (
+        # Billing summaries filter deductions by user and time range
+        Index("ix_transaction_type_user_id_timestamp", "transaction_type", "user_id", "timestamp"),
+    )
     id: UUID | None = Field(default_factory=uuid4, primary_key=True)
 
 
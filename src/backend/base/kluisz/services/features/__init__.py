@@ -4,6 +4,7 @@ from kluisz.services.features.control_service import (
     FeatureControlService,
     FeatureValue,
     ResolvedFeatures,
+    get_feature_service,
 )
 from kluisz.services.features.validation_service import (
     FeatureValidationService,
@@ -20,6 +21,7 @@ __all__ = [
     "FeatureControlService",
     "FeatureValue",
     "ResolvedFeatures",
+    "get_feature_service",
     # Validation service
     "FeatureValidationService",
     "ValidationResult",
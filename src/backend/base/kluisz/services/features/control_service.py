@@ -1,15 +1,17 @@
 """Feature Control Service - Manages user feature flags based on license tiers."""
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from typing import Any, TypedDict
 from uuid import UUID
 
+from cachetools import TTLCache
 from klx.log.logger import logger
 from klx.services.deps import session_scope
 from sqlmodel import and_, select
 
 from kluisz.schema.serialize import UUIDstr, str_to_uuid
 from kluisz.services.base import Service
+from kluisz.services.cache.base import ExternalAsyncBaseCacheService
 
 
 class FeatureValue(TypedDict, total=False):
@@ -31,6 +33,12 @@ class ResolvedFeatures(TypedDict):
     cache_key: str
 
 
+# Per-process cache of resolved features, consulted before the shared cache service.
+# Kept short so other workers pick up tier changes quickly; entries are dropped on
+# invalidation in this process. Only touched from the event loop, so no lock is needed.
+_local_feature_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+
+
 class FeatureControlService(Service):
     """
     Manages feature flags with simple inheritance:
@@ -44,7 +52,7 @@ class FeatureControlService(Service):
     """
 
     name = "feature_control_service"
-    CACHE_TTL = 300  # 5 minutes
+    CACHE_TTL = 60  # 1 minute
     CACHE_PREFIX = "features:"
 
     @property
@@ -83,8 +91,12 @@ class FeatureControlService(Service):
 
         # Check cache first
         if not bypass_cache:
+            cached = _local_feature_cache.get(cache_key)
+            if cached:
+                return cached
             cached = await self._get_cached_features(cache_key)
             if cached:
+                _local_feature_cache[cache_key] = cached
                 return cached
 
         from kluisz.services.database.models.license_tier.model import LicenseTier
@@ -123,6 +135,7 @@ class FeatureControlService(Service):
             }
 
             # Cache result
+            _local_feature_cache[cache_key] = result
             await self._cache_features(cache_key, result)
 
             return result
@@ -143,18 +156,51 @@ class FeatureControlService(Service):
             True if feature is enabled
         """
         features = await self.get_user_features(user_id)
-        feature = features["features"].get(feature_key)
+        return self._is_enabled(features["features"].get(feature_key))
 
-        if not feature:
+    async def is_any_feature_enabled(
+        self,
+        user_id: UUIDstr,
+        feature_keys: list[str],
+    ) -> bool:
+        """
+        Check if at least one of several features is enabled for a user.
+
+        Resolves the user's features once instead of once per key.
+
+        Args:
+            user_id: User UUID
+            feature_keys: Feature keys to check (OR logic)
+
+        Returns:
+            True if any of the features is enabled
+        """
+        if not feature_keys:
             return False
+        features = (await self.get_user_features(user_id))["features"]
+        return any(self._is_enabled(features.get(feature_key)) for feature_key in feature_keys)
 
-        # Check expiration
-        if feature.get("expires_at"):
-            expires = datetime.fromisoformat(feature["expires_at"])
-            if expires < datetime.now(timezone.utc):
-                return False
+    async def are_features_enabled(
+        self,
+        user_id: UUIDstr,
+        feature_keys: list[str] | tuple[str, ...],
+    ) -> dict[str, bool]:
+        """
+        Check several features for a user in one lookup.
 
-        return feature.get("enabled", False)
+        Resolves the user's features once instead of once per key.
+
+        Args:
+            user_id: User UUID
+            feature_keys: Feature keys to check
+
+        Returns:
+            Mapping of each feature key to whether it is enabled, in input order
+        """
+        if not feature_keys:
+            return {}
+        features = (await self.get_user_features(user_id))["features"]
+        return {feature_key: self._is_enabled(features.get(feature_key)) for feature_key in feature_keys}
 
     async def get_feature_value(
         self,
@@ -456,6 +502,19 @@ class FeatureControlService(Service):
         # For now, return as-is
         return features
 
+    def _is_enabled(self, feature: FeatureValue | None) -> bool:
+        """Check a resolved feature value, treating expired features as disabled."""
+        if not feature:
+            return False
+
+        # Check expiration
+        if feature.get("expires_at"):
+            expires = datetime.fromisoformat(feature["expires_at"])
+            if expires < datetime.now(timezone.utc):
+                return False
+
+        return feature.get("enabled", False)
+
     def _normalize_feature_value(self, value: Any) -> dict:
         """Normalize feature value to standard format."""
         if isinstance(value, bool):
@@ -464,16 +523,27 @@ class FeatureControlService(Service):
             return value
         return {"enabled": bool(value), "value": value}
 
+    def _get_shared_cache(self) -> ExternalAsyncBaseCacheService | None:
+        """Return the cross-process cache, if one is configured.
+
+        An in-memory cache service would only duplicate ``_local_feature_cache``.
+        """
+        from kluisz.services.deps import get_cache_service
+
+        cache = get_cache_service()
+        return cache if isinstance(cache, ExternalAsyncBaseCacheService) else None
+
     async def _get_cached_features(self, cache_key: str) -> ResolvedFeatures | None:
-        """Get features from cache."""
+        """Get features from the shared cache, ignoring entries older than CACHE_TTL."""
         try:
-            from kluisz.services.cache import get_cache_service
-
-            cache = get_cache_service()
+            cache = self._get_shared_cache()
             if cache:
                 cached = await cache.get(cache_key)
+                # The shared cache expires entries on its own schedule; enforce ours here
                 if cached:
-                    return cached
+                    age = datetime.now(timezone.utc) - datetime.fromisoformat(cached["computed_at"])
+                    if age < timedelta(seconds=self.CACHE_TTL):
+                        return cached
         except Exception as e:
             logger.warning(f"Cache read error: {e}")
         return None
@@ -481,21 +551,22 @@ class FeatureControlService(Service):
     async def _cache_features(self, cache_key: str, features: ResolvedFeatures) -> None:
         """Cache resolved features."""
         try:
-            from kluisz.services.cache import get_cache_service
-
-            cache = get_cache_service()
+            cache = self._get_shared_cache()
             if cache:
-                await cache.set(cache_key, features, ttl=self.CACHE_TTL)
+                await cache.set(cache_key, features)
         except Exception as e:
             logger.warning(f"Cache write error: {e}")
 
+    async def invalidate_user_features(self, user_id: UUIDstr) -> None:
+        """Drop a user's cached features, e.g. after their license tier changes."""
+        await self._invalidate_user_cache(user_id)
+
     async def _invalidate_user_cache(self, user_id: UUIDstr) -> None:
         """Invalidate cache for a specific user."""
         cache_key = f"{self.CACHE_PREFIX}user:{user_id}"
+        _local_feature_cache.pop(cache_key, None)
         try:
-            from kluisz.services.cache import get_cache_service
-
-            cache = get_cache_service()
+            cache = self._get_shared_cache()
             if cache:
                 await cache.delete(cache_key)
         except Exception as e:
@@ -544,5 +615,12 @@ class FeatureControlService(Service):
         pass
 
 
+_feature_service: FeatureControlService | None = None
 
 
+def get_feature_service() -> FeatureControlService:
+    """Get the singleton feature control service instance."""
+    global _feature_service
+    if _feature_service is None:
+        _feature_service = FeatureControlService()
+    return _feature_service
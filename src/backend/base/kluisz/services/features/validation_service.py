@@ -19,7 +19,7 @@ from typing import Any, Dict, List, Optional
 
 from klx.log.logger import logger
 
-from kluisz.services.features.control_service import FeatureControlService
+from kluisz.services.features.control_service import get_feature_service
 
 
 class OperationType(str, Enum):
@@ -168,7 +168,7 @@ class FeatureValidationService:
     """
 
     def __init__(self):
-        self.feature_service = FeatureControlService()
+        self.feature_service = get_feature_service()
 
     async def validate_operation(
         self,
@@ -207,20 +207,12 @@ class FeatureValidationService:
                 context=context,
             )
 
-        # Check features (OR logic for base operation)
-        missing = []
-        has_any = False
-
-        for feature_key in required:
-            try:
-                if await self.feature_service.is_feature_enabled(user_id, feature_key):
-                    has_any = True
-                    break
-                else:
-                    missing.append(feature_key)
-            except Exception as e:
-                await logger.awarning(f"Feature check error for {feature_key}: {e}")
-                missing.append(feature_key)
+        # Check features (OR logic for base operation), resolving the user's features once
+        try:
+            has_any = await self.feature_service.is_any_feature_enabled(user_id, required)
+        except Exception as e:
+            await logger.awarning(f"Feature check error for {', '.join(required)}: {e}")
+            has_any = False
 
         if has_any:
             return ValidationResult(
@@ -233,8 +225,8 @@ class FeatureValidationService:
 
         return ValidationResult(
             allowed=False,
-            missing_features=missing,
-            message=f"Operation requires one of: {', '.join(missing)}",
+            missing_features=required,
+            message=f"Operation requires one of: {', '.join(required)}",
             operation=op_name,
             context=context,
         )
@@ -15,6 +15,7 @@ from kluisz.services.database.models.license_tier.model import LicenseTier
 from kluisz.services.database.models.tenant.model import Tenant
 from kluisz.services.database.models.transactions.model import TransactionTable
 from kluisz.services.database.models.user.model import User
+from kluisz.services.features.control_service import get_feature_service
 
 
 class LicenseService(Service):
@@ -143,6 +144,9 @@ class LicenseService(Service):
             await session.commit()
             await session.refresh(user)
 
+            # The user's tier changed, so their resolved features did too
+            await get_feature_service().invalidate_user_features(user_id)
+
             return user
 
     async def unassign_license_from_user(self, user_id: UUIDstr) -> User:
@@ -191,6 +195,9 @@ class LicenseService(Service):
             await session.commit()
             await session.refresh(user)
 
+            # The user's tier changed, so their resolved features did too
+            await get_feature_service().invalidate_user_features(user_id)
+
             return user
 
     async def upgrade_user_license(
@@ -290,6 +297,9 @@ class LicenseService(Service):
             await session.commit()
             await session.refresh(user)
 
+            # The user's tier changed, so their resolved features did too
+            await get_feature_service().invalidate_user_features(user_id)
+
             return user
 
     async def deduct_credits(
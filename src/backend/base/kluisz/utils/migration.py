@@ -1,4 +1,8 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+
 import sqlalchemy as sa
+from alembic import op
 
 
 def table_exists(name, conn):
@@ -59,3 +63,88 @@ def constraint_exists(table_name, constraint_name, conn):
     inspector = sa.inspect(conn)
     constraints = inspector.get_unique_constraints(table_name)
     return constraint_name in [constraint["name"] for constraint in constraints]
+
+
+@contextmanager
+def autocommit_block() -> Iterator[None]:
+    """Run statements outside the migration transaction without giving up the migration lock.
+
+    env.py runs every revision in one transaction that holds a transaction-scoped advisory lock
+    and a ``SET LOCAL lock_timeout``. Committing that transaction for statements such as
+    ``CREATE INDEX CONCURRENTLY`` would release both. On PostgreSQL the lock is therefore also
+    held at session level while the block runs. Afterwards both are taken again in the migration
+    transaction that follows, and the session-level lock is released.
+
+    If the block fails, nothing is restored and the error propagates. env.py then rolls back and
+    closes the connection, which releases the session-level lock.
+    """
+    migration_context = op.get_context()
+    conn = op.get_bind()
+    lock_key = migration_context.opts.get("migration_lock_key")
+    if conn.dialect.name != "postgresql" or lock_key is None:
+        with migration_context.autocommit_block():
+            yield
+        return
+
+    lock_timeout = conn.execute(sa.text("SHOW lock_timeout")).scalar()
+    conn.execute(sa.text("SELECT pg_advisory_lock(:key)"), {"key": lock_key})
+    with migration_context.autocommit_block():
+        conn.execute(sa.text("SELECT set_config('lock_timeout', :value, false)"), {"value": lock_timeout})
+        yield
+        conn.execute(sa.text("RESET lock_timeout"))
+    conn.execute(sa.text("SELECT set_config('lock_timeout', :value, true)"), {"value": lock_timeout})
+    conn.execute(sa.text("SELECT pg_advisory_xact_lock(:key)"), {"key": lock_key})
+    conn.execute(sa.text("SELECT pg_advisory_unlock(:key)"), {"key": lock_key})
+
+
+def invalid_indexes(conn) -> set[str]:
+    """Return the names of the invalid indexes in the current schema (PostgreSQL only).
+
+    A failed ``CREATE INDEX CONCURRENTLY`` leaves an INVALID index behind under its name. The
+    inspector still reports it, so callers that check for existing indexes should treat these
+    as missing.
+
+    Parameters:
+    conn (sqlalchemy.engine.Connection): The SQLAlchemy connection to use.
+
+    Returns:
+    set[str]: The invalid index names, empty on other dialects.
+    """
+    if conn.dialect.name != "postgresql":
+        return set()
+    result = conn.execute(
+        sa.text(
+            "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE NOT i.indisvalid AND c.relnamespace = current_schema()::regnamespace"
+        )
+    )
+    return set(result.scalars())
+
+
+def create_index_concurrently(index_name, table_name, columns, **kwargs) -> None:
+    """Build an index with ``CREATE INDEX CONCURRENTLY``, replacing an invalid leftover.
+
+    ``IF NOT EXISTS`` would keep the INVALID index a failed build leaves behind, so a valid
+    index is kept and an invalid one is dropped and built again. Must run inside
+    ``autocommit_block()``.
+
+    Parameters:
+    index_name (str): The name of the index.
+    table_name (str): The table to index.
+    columns (list[str]): The indexed columns.
+    **kwargs: Passed on to ``op.create_index``.
+    """
+    conn = op.get_bind()
+    result = conn.execute(
+        sa.text(
+            "SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND c.relnamespace = current_schema()::regnamespace"
+        ),
+        {"name": index_name},
+    )
+    is_valid = result.scalar()
+    if is_valid:
+        return
+    if is_valid is not None:
+        op.drop_index(index_name, table_name=table_name, postgresql_concurrently=True)
+    op.create_index(index_name, table_name, columns, postgresql_concurrently=True, **kwargs)
@@ -0,0 +1,121 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from kluisz.api.middleware import feature_middleware
+from kluisz.api.middleware.feature_middleware import (
+    FeatureEnforcementMiddleware,
+    FeatureEnforcementMiddlewareStrict,
+)
+
+
+class FakeFeatureService:
+    instances = 0
+
+    def __init__(self):
+        FakeFeatureService.instances += 1
+        self.enabled: set[str] = set()
+        self.calls: list[tuple[str, list[str]]] = []
+        self.error: Exception | None = None
+
+    async def is_any_feature_enabled(self, user_id, feature_keys):
+        self.calls.append((user_id, feature_keys))
+        if self.error:
+            raise self.error
+        return any(feature_key in self.enabled for feature_key in feature_keys)
+
+
+@pytest.fixture
+def fake_service(monkeypatch):
+    FakeFeatureService.instances = 0
+    monkeypatch.setattr(feature_middleware, "FeatureControlService", FakeFeatureService)
+
+
+def make_client(middleware_class, user=None):
+    app = FastAPI()
+
+    @app.get("/api/v1/webhooks/{name}")
+    async def webhook(name: str):
+        return {"name": name}
+
+    @app.get("/api/v1/mcp/servers")
+    async def mcp_servers():
+        return {"servers": []}
+
+    app.add_middleware(middleware_class)
+
+    @app.middleware("http")
+    async def set_user(request: Request, call_next):
+        request.state.user = user
+        return await call_next(request)
+
+    client = TestClient(app)
+    # Build the middleware stack so the enforcement middleware can be inspected
+    client.get("/api/v1/unprotected")
+    middleware = app.middleware_stack.app
+    while not isinstance(middleware, middleware_class):
+        middleware = middleware.app
+    return client, middleware._service
+
+
+@pytest.mark.usefixtures("fake_service")
+@pytest.mark.parametrize("middleware_class", [FeatureEnforcementMiddleware, FeatureEnforcementMiddlewareStrict])
+def test_service_is_created_once(middleware_class):
+    user = SimpleNamespace(id="u1", is_platform_superadmin=False)
+    client, service = make_client(middleware_class, user)
+    service.enabled.add("api.webhooks")
+
+    for _ in range(3):
+        assert client.get("/api/v1/webhooks/hook").status_code == 200
+
+    assert FakeFeatureService.instances == 1
+    assert service.calls == [("u1", ["api.webhooks"])] * 3
+
+
+@pytest.mark.usefixtures("fake_service")
+def test_denies_when_no_required_feature_is_enabled():
+    user = SimpleNamespace(id="u1", is_platform_superadmin=False)
+    client, service = make_client(FeatureEnforcementMiddleware, user)
+
+    response = client.get("/api/v1/mcp/servers")
+
+    assert response.status_code == 403
+    assert response.json()["required_features"] == ["integrations.mcp", "ui.advanced.mcp_server_config"]
+    # All required features are checked with a single call
+    assert service.calls == [("u1", ["integrations.mcp", "ui.advanced.mcp_server_config"])]
+
+
+@pytest.mark.usefixtures("fake_service")
+@pytest.mark.parametrize(
+    ("middleware_class", "status_code"),
+    [(FeatureEnforcementMiddleware, 403), (FeatureEnforcementMiddlewareStrict, 503)],
+)
+def test_feature_check_errors(middleware_class, status_code):
+    user = SimpleNamespace(id="u1", is_platform_superadmin=False)
+    client, service = make_client(middleware_class, user)
+    service.error = ValueError("User u1 not found")
+
+    assert client.get("/api/v1/mcp/servers").status_code == status_code
+
+
+@pytest.mark.usefixtures("fake_service")
+def test_superadmin_and_anonymous_bypass_checks():
+    admin = SimpleNamespace(id="admin", is_platform_superadmin=True)
+    for user in (admin, None):
+        client, service = make_client(FeatureEnforcementMiddleware, user)
+        assert client.get("/api/v1/mcp/servers").status_code == 200
+        assert service.calls == []
+
+
+@pytest.mark.usefixtures("fake_service")
+@pytest.mark.parametrize("middleware_class", [FeatureEnforcementMiddleware, FeatureEnforcementMiddlewareStrict])
+def test_options_skips_checks_but_head_does_not(middleware_class):
+    user = SimpleNamespace(id="u1", is_platform_superadmin=False)
+    client, service = make_client(middleware_class, user)
+
+    assert client.options("/api/v1/mcp/servers").status_code == 405
+    assert service.calls == []
+
+    assert client.head("/api/v1/mcp/servers").status_code == 403
+    assert len(service.calls) == 1
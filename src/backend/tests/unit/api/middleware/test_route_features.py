@@ -0,0 +1,109 @@
+import pytest
+from kluisz.api.middleware.route_features import (
+    add_route_protection,
+    classify_route,
+    get_required_features,
+    is_route_exempt,
+    remove_route_protection,
+)
+
+
+@pytest.mark.parametrize(
+    ("path", "features"),
+    [
+        ("/api/v1/mcp/servers", ["integrations.mcp", "ui.advanced.mcp_server_config"]),
+        ("/API/V2/MCP/SSE/stream", ["integrations.mcp"]),
+        ("/api/v1/flows/1234/export", ["ui.flow_builder.export_flow"]),
+        ("/api/v2/vector-stores/qdrant/collections", ["integrations.vector_stores.qdrant"]),
+        ("/api/v1/flows/1234", []),
+        ("/api/v1/unknown", []),
+    ],
+)
+def test_get_required_features(path, features):
+    assert get_required_features(path) == features
+
+
+@pytest.mark.parametrize(
+    ("path", "exempt"),
+    [
+        ("/health", True),
+        ("/api/v1/users/me", True),
+        ("/api/v1/users/me/extra", False),
+        ("/api/v1/flows/1234", True),
+        ("/api/v1/flows/1234/export", False),
+        ("/api/v1/mcp/servers", False),
+    ],
+)
+def test_is_route_exempt(path, exempt):
+    assert is_route_exempt(path) is exempt
+
+
+def test_dynamic_route_protection():
+    pattern = r"^/api/v[12]/reports.*"
+    assert get_required_features("/api/v1/reports/daily") == []
+
+    add_route_protection(pattern, ["analytics.reports"])
+    try:
+        assert get_required_features("/api/v1/reports/daily") == ["analytics.reports"]
+    finally:
+        assert remove_route_protection(pattern) is True
+
+    assert get_required_features("/api/v1/reports/daily") == []
+    assert remove_route_protection(pattern) is False
+
+
+def test_dynamic_pattern_with_groups_keeps_priority():
+    pattern = r"^/api/v[12]/(reports|exports)/(?P<kind>[^/]+)$"
+    add_route_protection(pattern, ["analytics.reports"])
+    try:
+        assert get_required_features("/api/v1/exports/csv") == ["analytics.reports"]
+        # Earlier patterns still win over later ones
+        assert get_required_features("/api/v1/flows/1234/export") == ["ui.flow_builder.export_flow"]
+    finally:
+        remove_route_protection(pattern)
+
+
+def test_id_segments_share_a_cache_entry():
+    from kluisz.api.middleware.route_features import _classify_path
+
+    _classify_path.cache_clear()
+    first = "/api/v1/flows/0b7f9c1e-3a6d-4f2e-9b1a-5c8d7e6f4a3b/export"
+    second = "/api/v1/flows/9E8D7C6B-5A4F-4E3D-8C2B-1A0F9E8D7C6B/export"
+
+    assert get_required_features(first) == ["ui.flow_builder.export_flow"]
+    assert get_required_features(second) == ["ui.flow_builder.export_flow"]
+    assert _classify_path.cache_info().hits == 1
+    assert is_route_exempt("/api/v1/flows/0b7f9c1e-3a6d-4f2e-9b1a-5c8d7e6f4a3b")
+
+
+def test_literal_exempt_routes_skip_the_regex_cache():
+    from kluisz.api.middleware.route_features import _classify_path, _literal
+
+    assert _literal(r"/openapi\.json") == "/openapi.json"
+    assert _literal("/api/v[12]/health") is None
+    assert _literal(r"/assets\d") is None
+
+    _classify_path.cache_clear()
+    assert is_route_exempt("/health/live")
+    assert is_route_exempt("/openapi.json")
+    assert get_required_features("/static/js/app.js") == []
+    assert _classify_path.cache_info().currsize == 0
+
+    # Case-insensitive matches still go through the regex
+    assert is_route_exempt("/HEALTH")
+    assert not is_route_exempt("/openapiXjson")
+
+
+@pytest.mark.parametrize(
+    ("path", "expected"),
+    [
+        ("/health", (True, [])),
+        ("/api/v1/flows/1234", (True, [])),
+        ("/api/v1/webhooks/hook", (False, ["api.webhooks"])),
+        ("/api/v1/unknown", (False, [])),
+    ],
+)
+def test_classify_route(path, expected):
+    assert classify_route(path) == expected
+    assert is_route_exempt(path) is expected[0]
+    assert get_required_features(path) == expected[1]
@@ -0,0 +1,101 @@
+"""Unit tests for the feature enforcement dependencies."""
+
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.testclient import TestClient
+from kluisz.api.utils import feature_enforcement
+from kluisz.api.utils.feature_enforcement import (
+    FeatureNotEnabled,
+    require_all_features,
+    require_any_feature,
+    require_feature,
+)
+from kluisz.services.auth.utils import get_current_active_user
+
+
+class FakeFeatureService:
+    """Feature service answering from a fixed set of enabled keys."""
+
+    def __init__(self, enabled: set[str]):
+        self.enabled = enabled
+        self.calls: list[tuple[str, tuple[str, ...]]] = []
+
+    async def are_features_enabled(self, user_id, feature_keys):
+        self.calls.append((user_id, tuple(feature_keys)))
+        return {feature_key: feature_key in self.enabled for feature_key in feature_keys}
+
+
+@pytest.fixture
+def service(monkeypatch):
+    fake = FakeFeatureService({"feature.a"})
+    monkeypatch.setattr(feature_enforcement, "get_feature_service", lambda: fake)
+    return fake
+
+
+@pytest.fixture
+def user():
+    return SimpleNamespace(id=uuid4(), is_platform_superadmin=False)
+
+
+async def test_require_any_feature_checks_all_keys_at_once(service, user):
+    assert await require_any_feature("feature.b", "feature.a")(user) is True
+    assert service.calls == [(str(user.id), ("feature.b", "feature.a"))]
+
+
+async def test_require_any_feature_denies_when_none_enabled(service, user):
+    with pytest.raises(FeatureNotEnabled) as exc_info:
+        await require_any_feature("feature.b", "feature.c")(user)
+
+    assert exc_info.value.status_code == 403
+    assert exc_info.value.detail == "At least one of these features must be enabled: feature.b, feature.c"
+    assert len(service.calls) == 1
+
+
+async def test_require_all_features_passes_when_all_enabled(service, user):
+    service.enabled.add("feature.b")
+
+    assert await require_all_features("feature.a", "feature.b")(user) is True
+    assert len(service.calls) == 1
+
+
+async def test_require_all_features_reports_missing(service, user):
+    with pytest.raises(FeatureNotEnabled) as exc_info:
+        await require_all_features("feature.c", "feature.a", "feature.b")(user)
+
+    assert exc_info.value.detail == "These features must be enabled: feature.c, feature.b"
+    assert len(service.calls) == 1
+
+
+async def test_superadmin_bypasses_checks(service):
+    superadmin = SimpleNamespace(id=uuid4(), is_platform_superadmin=True)
+
+    assert await require_all_features("feature.c")(superadmin) is True
+    assert await require_any_feature("feature.c")(superadmin) is True
+    assert service.calls == []
+
+
+def test_guard_factories_return_the_same_dependency():
+    assert require_feature("feature.a") is require_feature("feature.a")
+    assert require_feature("feature.a") is not require_feature("feature.a", detail="custom")
+    assert require_any_feature("feature.a", "feature.b") is require_any_feature("feature.a", "feature.b")
+    assert require_all_features("feature.a", "feature.b") is require_all_features("feature.a", "feature.b")
+
+
+def test_repeated_guard_is_resolved_once_per_request(service, user):
+    router = APIRouter(dependencies=[Depends(require_any_feature("feature.a", "feature.b"))])
+
+    @router.get("/guarded")
+    async def guarded(_: bool = Depends(require_any_feature("feature.a", "feature.b"))):
+        return {"ok": True}
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_current_active_user] = lambda: user
+
+    response = TestClient(app).get("/guarded")
+
+    assert response.status_code == 200
+    assert len(service.calls) == 1
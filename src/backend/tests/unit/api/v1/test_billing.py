@@ -0,0 +1,116 @@
+"""Unit tests for the billing transaction summaries."""
+
+from datetime import date, datetime, timezone
+from uuid import uuid4
+
+import pytest
+from kluisz.api.v1.billing import _get_tenant_usage_bulk, _get_transaction_summary
+from kluisz.services.database.models.transactions.model import TransactionTable
+from kluisz.services.database.models.user.model import User
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+@pytest.fixture
+async def session():
+    """Create an in-memory database session for testing."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+
+    await engine.dispose()
+
+
+@pytest.fixture
+async def user_ids(session: AsyncSession):
+    """Create deductions for two users plus rows the summary must ignore."""
+    first, second = uuid4(), uuid4()
+    rows = [
+        (first, "deduction", 10, {"total_tokens": 100, "cost_usd": 0.25}, datetime(2025, 1, 10, tzinfo=timezone.utc)),
+        (first, "deduction", 5, {"total_tokens": 20}, datetime(2025, 1, 20, tzinfo=timezone.utc)),
+        (second, "deduction", None, None, datetime(2025, 1, 10, tzinfo=timezone.utc)),
+        (second, "deduction", 7, {"cost_usd": 1.5}, datetime(2025, 1, 11, tzinfo=timezone.utc)),
+        (first, "addition", 1000, {"total_tokens": 9999}, datetime(2025, 1, 10, tzinfo=timezone.utc)),
+    ]
+    for user_id, transaction_type, credits_amount, metadata, timestamp in rows:
+        session.add(
+            TransactionTable(
+                user_id=user_id,
+                transaction_type=transaction_type,
+                credits_amount=credits_amount,
+                transaction_metadata=metadata,
+                timestamp=timestamp,
+            )
+        )
+    await session.commit()
+    return first, second
+
+
+async def test_summary_aggregates_deductions(session, user_ids):
+    summary = await _get_transaction_summary(session, list(user_ids))
+
+    assert summary["total_flow_runs"] == 4
+    assert summary["total_credits_used"] == 22
+    assert summary["total_tokens"] == 120
+    assert summary["total_cost_usd"] == pytest.approx(1.75)
+    assert summary["active_users_count"] == 2
+
+
+async def test_summary_filters_users_and_dates(session, user_ids):
+    summary = await _get_transaction_summary(session, [user_ids[0]], date(2025, 1, 1), date(2025, 1, 15))
+
+    assert summary == {
+        "total_flow_runs": 1,
+        "total_credits_used": 10,
+        "total_tokens": 100,
+        "total_cost_usd": pytest.approx(0.25),
+        "active_users_count": 1,
+        "start_date": "2025-01-01",
+        "end_date": "2025-01-15",
+    }
+
+
+async def test_summary_without_transactions(session):
+    summary = await _get_transaction_summary(session, [uuid4()])
+
+    assert summary["total_flow_runs"] == 0
+    assert summary["total_credits_used"] == 0
+    assert summary["total_tokens"] == 0
+    assert summary["total_cost_usd"] == 0.0
+    assert summary["active_users_count"] == 0
+
+
+async def test_tenant_usage_is_grouped_per_tenant(session, user_ids):
+    tenant_a, tenant_b, empty_tenant = uuid4(), uuid4(), uuid4()
+    session.add(User(id=user_ids[0], username="first", password="hashed", tenant_id=tenant_a))
+    session.add(User(id=user_ids[1], username="second", password="hashed", tenant_id=tenant_b))
+    await session.commit()
+
+    usage = await _get_tenant_usage_bulk(
+        session, [tenant_a, tenant_b, empty_tenant], date(2025, 1, 1), date(2025, 1, 31)
+    )
+
+    assert usage[str(tenant_a)]["total_flow_runs"] == 2
+    assert usage[str(tenant_a)]["total_credits_used"] == 15
+    assert usage[str(tenant_a)]["total_tokens"] == 120
+    assert usage[str(tenant_b)]["total_flow_runs"] == 2
+    assert usage[str(tenant_b)]["total_cost_usd"] == pytest.approx(1.5)
+    assert usage[str(tenant_b)]["active_users_count"] == 1
+    # A tenant without users does not pick up anyone else's transactions
+    assert usage[str(empty_tenant)] == {
+        "total_flow_runs": 0,
+        "total_credits_used": 0,
+        "total_tokens": 0,
+        "total_cost_usd": 0.0,
+        "active_users_count": 0,
+        "start_date": "2025-01-01",
+        "end_date": "2025-01-31",
+    }
+
+
+async def test_tenant_usage_without_tenants(session):
+    assert await _get_tenant_usage_bulk(session, []) == {}
@@ -0,0 +1,21 @@
+"""Unit tests for the license tier info endpoint."""
+
+import orjson
+from kluisz.api.v1.licenses import _tier_info_body, get_tier_info
+from kluisz.services.database.models.license.tier_config import TIER_CONFIGS
+
+
+async def test_tier_info_lists_every_configured_tier():
+    response = await get_tier_info(current_user=None)
+
+    assert response.media_type == "application/json"
+    tiers = orjson.loads(response.body)["tiers"]
+    assert [tier["tier"] for tier in tiers] == [tier.value for tier in TIER_CONFIGS]
+    basic = tiers[0]
+    assert basic["price"] == "29.00"
+    assert basic["max_users"] == 5
+    assert basic["features"]["api_access"] is True
+
+
+def test_tier_info_is_serialized_once():
+    assert _tier_info_body() is _tier_info_body()
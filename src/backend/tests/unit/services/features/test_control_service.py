@@ -0,0 +1,242 @@
+"""Unit tests for Feature Control Service."""
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from kluisz.services.cache.base import ExternalAsyncBaseCacheService
+from kluisz.services.database.models.feature.model import FeatureRegistry
+from kluisz.services.database.models.user.model import User
+from kluisz.services.features import control_service
+from kluisz.services.features.control_service import FeatureControlService, get_feature_service
+from klx.services.cache.utils import CACHE_MISS
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+
+@pytest.fixture(autouse=True)
+def clear_local_feature_cache():
+    """Keep the per-process feature cache from leaking between tests."""
+    control_service._local_feature_cache.clear()
+    yield
+    control_service._local_feature_cache.clear()
+
+
+class FakeSharedCache(ExternalAsyncBaseCacheService):
+    """Dict-backed stand-in for the Redis cache service."""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key, lock=None):  # noqa: ARG002
+        return self.data.get(key, CACHE_MISS)
+
+    async def set(self, key, value, lock=None):  # noqa: ARG002
+        self.data[key] = value
+
+    async def upsert(self, key, value, lock=None):  # noqa: ARG002
+        self.data[key] = value
+
+    async def delete(self, key, lock=None):  # noqa: ARG002
+        self.data.pop(key, None)
+
+    async def clear(self, lock=None):  # noqa: ARG002
+        self.data.clear()
+
+    async def contains(self, key):
+        return key in self.data
+
+    async def is_connected(self):
+        return True
+
+
+@pytest.fixture(autouse=True)
+def shared_cache(monkeypatch):
+    """Replace the configured cache service with an in-memory shared cache."""
+    cache = FakeSharedCache()
+    monkeypatch.setattr("kluisz.services.deps.get_cache_service", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+async def session():
+    """Create an in-memory database session for testing."""
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    async_session_maker = async_sessionmaker(
+        engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
+
+    async with async_session_maker() as session:
+        yield session
+
+    await engine.dispose()
+
+
+@pytest.fixture
+async def db_feature_service(session, monkeypatch):
+    """Create a FeatureControlService backed by the test session, counting session use."""
+    service = FeatureControlService()
+    service.sessions = 0
+
+    @asynccontextmanager
+    async def mock_session_scope():
+        """Mock session_scope to use the test session."""
+        service.sessions += 1
+        yield session
+
+    monkeypatch.setattr("kluisz.services.features.control_service.session_scope", mock_session_scope)
+    return service
+
+
+@pytest.fixture
+async def sample_user(session: AsyncSession):
+    """Create a user without a license tier and one enabled registry feature."""
+    user = User(id=uuid4(), username="testuser", password="hashed_password", is_active=True)
+    session.add(user)
+    session.add(
+        FeatureRegistry(
+            feature_key="api.webhooks",
+            feature_name="Webhooks",
+            category="api",
+            default_value={"enabled": True},
+        )
+    )
+    await session.commit()
+    return user
+
+
+@pytest.fixture
+def feature_service(monkeypatch):
+    """Create a FeatureControlService whose resolution is counted."""
+    service = FeatureControlService()
+    expired = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+    resolved = {
+        "features": {
+            "api.webhooks": {"enabled": True, "expires_at": None},
+            "api.batch_execution": {"enabled": False, "expires_at": None},
+            "integrations.mcp": {"enabled": True, "expires_at": expired},
+        },
+        "tier_id": None,
+        "tier_name": None,
+        "computed_at": "",
+        "cache_key": "",
+    }
+    service.resolutions = 0
+
+    async def get_user_features(user_id, *, bypass_cache=False):  # noqa: ARG001
+        service.resolutions += 1
+        return resolved
+
+    monkeypatch.setattr(service, "get_user_features", get_user_features)
+    return service
+
+
+@pytest.mark.parametrize(
+    ("feature_keys", "expected"),
+    [
+        (["api.batch_execution", "api.webhooks"], True),
+        (["api.batch_execution", "integrations.mcp"], False),
+        (["unknown.feature"], False),
+    ],
+)
+async def test_is_any_feature_enabled(feature_service, feature_keys, expected):
+    assert await feature_service.is_any_feature_enabled("u1", feature_keys) is expected
+    assert feature_service.resolutions == 1
+
+
+async def test_is_any_feature_enabled_without_keys(feature_service):
+    assert await feature_service.is_any_feature_enabled("u1", []) is False
+    assert feature_service.resolutions == 0
+
+
+async def test_are_features_enabled(feature_service):
+    results = await feature_service.are_features_enabled(
+        "u1", ("integrations.mcp", "api.webhooks", "unknown.feature", "api.batch_execution")
+    )
+
+    assert results == {
+        "integrations.mcp": False,
+        "api.webhooks": True,
+        "unknown.feature": False,
+        "api.batch_execution": False,
+    }
+    assert list(results) == ["integrations.mcp", "api.webhooks", "unknown.feature", "api.batch_execution"]
+    assert feature_service.resolutions == 1
+
+
+async def test_are_features_enabled_without_keys(feature_service):
+    assert await feature_service.are_features_enabled("u1", ()) == {}
+    assert feature_service.resolutions == 0
+
+
+async def test_is_feature_enabled_treats_expired_as_disabled(feature_service):
+    assert await feature_service.is_feature_enabled("u1", "api.webhooks") is True
+    assert await feature_service.is_feature_enabled("u1", "integrations.mcp") is False
+
+
+async def test_resolved_features_are_cached_in_process(db_feature_service, sample_user):
+    user_id = str(sample_user.id)
+
+    assert await db_feature_service.is_feature_enabled(user_id, "api.webhooks") is True
+    assert await db_feature_service.is_feature_enabled(user_id, "api.webhooks") is True
+    assert db_feature_service.sessions == 1
+
+    await db_feature_service._invalidate_user_cache(user_id)
+    assert await db_feature_service.is_feature_enabled(user_id, "api.webhooks") is True
+    assert db_feature_service.sessions == 2
+
+
+async def test_bypass_cache_resolves_again(db_feature_service, sample_user):
+    user_id = str(sample_user.id)
+
+    await db_feature_service.get_user_features(user_id)
+    result = await db_feature_service.get_user_features(user_id, bypass_cache=True)
+
+    assert result["features"]["api.webhooks"]["enabled"] is True
+    assert db_feature_service.sessions == 2
+
+
+async def test_resolved_features_are_shared_across_processes(db_feature_service, sample_user, shared_cache):
+    user_id = str(sample_user.id)
+
+    await db_feature_service.get_user_features(user_id)
+    assert f"features:user:{user_id}" in shared_cache.data
+
+    # Another worker has an empty local cache but finds the shared entry
+    control_service._local_feature_cache.clear()
+    assert await db_feature_service.is_feature_enabled(user_id, "api.webhooks") is True
+    assert db_feature_service.sessions == 1
+
+
+async def test_stale_shared_entries_are_ignored(db_feature_service, sample_user, shared_cache):
+    user_id = str(sample_user.id)
+
+    cached = await db_feature_service.get_user_features(user_id)
+    stale = datetime.now(timezone.utc) - timedelta(seconds=FeatureControlService.CACHE_TTL + 1)
+    shared_cache.data[cached["cache_key"]] = {**cached, "computed_at": stale.isoformat()}
+    control_service._local_feature_cache.clear()
+
+    await db_feature_service.get_user_features(user_id)
+    assert db_feature_service.sessions == 2
+
+
+async def test_invalidate_user_features_clears_shared_cache(db_feature_service, sample_user, shared_cache):
+    user_id = str(sample_user.id)
+
+    await db_feature_service.get_user_features(user_id)
+    await db_feature_service.invalidate_user_features(user_id)
+
+    assert shared_cache.data == {}
+    assert f"features:user:{user_id}" not in control_service._local_feature_cache
+
+
+def test_get_feature_service_returns_a_singleton():
+    assert get_feature_service() is get_feature_service()
+    assert isinstance(get_feature_service(), FeatureControlService)
@@ -0,0 +1,55 @@
+"""Unit tests for Feature Validation Service."""
+
+import pytest
+from kluisz.services.features.validation_service import FeatureValidationService, OperationType
+
+
+class FakeFeatureService:
+    """Records batched feature checks."""
+
+    def __init__(self, enabled=(), error=None):
+        self.enabled = set(enabled)
+        self.error = error
+        self.calls = []
+
+    async def is_any_feature_enabled(self, user_id, feature_keys):
+        self.calls.append((user_id, feature_keys))
+        if self.error:
+            raise self.error
+        return any(feature_key in self.enabled for feature_key in feature_keys)
+
+
+def make_service(feature_service):
+    service = FeatureValidationService()
+    service.feature_service = feature_service
+    return service
+
+
+async def test_any_enabled_feature_allows_the_operation():
+    feature_service = FakeFeatureService(enabled={"ui.code_view.edit_code"})
+
+    result = await make_service(feature_service).validate_operation("u1", OperationType.EDIT_COMPONENT_CODE)
+
+    assert result.allowed is True
+    assert result.missing_features == []
+    assert feature_service.calls == [("u1", ["components.custom.code_editing", "ui.code_view.edit_code"])]
+
+
+@pytest.mark.parametrize("error", [None, ValueError("User u1 not found")])
+async def test_missing_features_are_reported(error):
+    feature_service = FakeFeatureService(error=error)
+
+    result = await make_service(feature_service).validate_operation("u1", OperationType.EDIT_COMPONENT_CODE)
+
+    assert result.allowed is False
+    assert result.missing_features == ["components.custom.code_editing", "ui.code_view.edit_code"]
+    assert len(feature_service.calls) == 1
+
+
+async def test_operations_without_requirements_skip_checks():
+    feature_service = FakeFeatureService()
+
+    result = await make_service(feature_service).validate_operation("u1", OperationType.EXECUTE_FLOW)
+
+    assert result.allowed is True
+    assert feature_service.calls == []
@@ -0,0 +1,136 @@
+"""Tests for the kluisz -> klx backwards compatibility layer in kluisz/__init__.py."""
+
+import importlib
+import sys
+from pathlib import Path
+
+import kluisz
+import pytest
+from kluisz import KluiszCompatibilityFinder, _klx_name_for
+
+
+@pytest.mark.parametrize(
+    ("kluisz_name", "klx_name"),
+    [
+        ("kluisz.base", "klx.base"),
+        ("kluisz.base.io", "klx.base.io"),
+        ("kluisz.base.models.openai_constants", "klx.base.models.openai_constants"),
+        ("kluisz.inputs.inputs", "klx.inputs.inputs"),
+        ("kluisz.schema.data", "klx.schema.data"),
+        ("kluisz.template.field.base", "klx.template.field.base"),
+        ("kluisz.components", "klx.components"),
+        ("kluisz.components.helpers", "klx.components.helpers"),
+        ("kluisz.components.openai", "klx.components.openai"),
+    ],
+)
+def test_mirrored_names_map_to_klx(kluisz_name, klx_name):
+    assert _klx_name_for(kluisz_name) == klx_name
+
+
+@pytest.mark.parametrize(
+    "kluisz_name",
+    [
+        "kluisz",
+        "kluisz.services",
+        "kluisz.api.v1",
+        "kluisz.baseline",
+        "kluisz.services.tracing.schema",
+        "kluisz.interface.initialize.loading",
+        "klx.base",
+    ],
+)
+def test_kluisz_only_names_are_not_mirrored(kluisz_name):
+    assert _klx_name_for(kluisz_name) is None
+
+
+def test_finder_is_registered_first():
+    assert isinstance(sys.meta_path[0], KluiszCompatibilityFinder)
+    assert sum(isinstance(finder, KluiszCompatibilityFinder) for finder in sys.meta_path) == 1
+
+
+def test_finder_ignores_unmirrored_modules():
+    assert KluiszCompatibilityFinder().find_spec("kluisz.services", None) is None
+
+
+def test_finder_ignores_modules_missing_from_klx():
+    finder = KluiszCompatibilityFinder()
+
+    assert finder.find_spec("kluisz.base.does_not_exist", None) is None
+    assert finder.find_spec("kluisz.base.models.openai_constants", None) is not None
+    assert finder.find_spec("kluisz.base.chains", None) is not None
+
+
+def test_finder_keeps_kluisz_implementations():
+    finder = KluiszCompatibilityFinder()
+
+    # Registered first, so it must decline every module that has its own file here
+    assert finder.find_spec("kluisz.schema.log", None) is None
+    assert finder.find_spec("kluisz.schema.playground_events", None) is None
+    assert finder.find_spec("kluisz.base.models", None) is None
+
+
+def test_kluisz_schema_modules_are_not_replaced():
+    schema_log = importlib.import_module("kluisz.schema.log")
+
+    assert schema_log.__name__ == "kluisz.schema.log"
+    assert importlib.import_module("kluisz.schema.artifact").__name__ == "kluisz.schema.artifact"
+
+
+def test_kluisz_packages_keep_their_own_path():
+    schema = importlib.import_module("kluisz.schema")
+    playground_events = importlib.import_module("kluisz.schema.playground_events")
+
+    assert schema.__name__ == "kluisz.schema"
+    assert Path(schema.__path__[0]) == Path(kluisz.__file__).parent / "schema"
+    assert playground_events.__name__ == "kluisz.schema.playground_events"
+
+
+def test_mirrored_module_is_the_klx_module():
+    klx_chat = importlib.import_module("klx.base.io.chat")
+    compat_chat = importlib.import_module("kluisz.base.io.chat")
+
+    assert compat_chat is klx_chat
+    assert sys.modules["kluisz.base.io.chat"] is klx_chat
+    assert kluisz.base.io.chat is klx_chat
+    # The klx module keeps its own identity
+    assert klx_chat.__name__ == "klx.base.io.chat"
+    assert klx_chat.__spec__.name == "klx.base.io.chat"
+
+
+def test_mirrored_modules_are_attached_on_import(monkeypatch):
+    name = "kluisz.base.models.groq_constants"
+    importlib.import_module(name)
+    models = sys.modules["kluisz.base.models"]
+    monkeypatch.delitem(sys.modules, name)
+    monkeypatch.delattr(models, "groq_constants")
+
+    # Setting up the finder no longer imports mirrored modules eagerly, so the attribute
+    # chain only resolves once the module itself is imported
+    kluisz._setup_compatibility_modules()
+    assert name not in sys.modules
+    assert not hasattr(models, "groq_constants")
+
+    groq_constants = importlib.import_module(name)
+
+    assert kluisz.base.models.groq_constants is groq_constants
+
+
+def test_mirrored_module_attributes_keep_class_identity():
+    from kluisz.components import import_mod
+    from klx.components import import_mod as klx_import_mod
+
+    assert import_mod is klx_import_mod
+
+
+def test_kluisz_only_module_is_not_linked_into_klx():
+    klx_components = importlib.import_module("klx.components")
+
+    assert "knowledge_bases" not in vars(klx_components) or (
+        vars(klx_components)["knowledge_bases"].__name__ == "klx.components.knowledge_bases"
+    )
+
+
+def test_redirected_klx_modules_are_mirrored():
+    memory = importlib.import_module("kluisz.components.helpers.memory")
+
+    assert memory.MemoryComponent is importlib.import_module("klx.components.models_and_agents.memory").MemoryComponent